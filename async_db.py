@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+logger = logging.getLogger("Async_DB")
+
+# ---------- 配置 ----------
+DB_WORKERS = 1          # 专用数据库线程数（SQLite 写入本身是串行的）
+MAX_PENDING = 256       # 排队中的数据库任务上限，超出后调用方在 await 处等待
+SLOW_WAIT_WARN = 0.5    # 排队等待超过该秒数时记录警告
+
+class DBExecutor:
+    """
+    把同步的 db.py / report.py 调用转移到专用线程执行，
+    保证 PTB 事件循环和 TRON 监听器不会被磁盘 IO 卡住
+    """
+
+    def __init__(self, workers: int = DB_WORKERS, max_pending: int = MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._max_pending = max_pending
+        self._slots = None  # 第一次使用时在事件循环内创建
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _timed(self, enqueued_at, func, *args, **kwargs):
+        started = time.monotonic()
+        wait = started - enqueued_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        if wait > SLOW_WAIT_WARN:
+            logger.warning(f"数据库任务 {getattr(func, '__name__', func)} 排队 {wait:.3f}s")
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.total_run += time.monotonic() - started
+
+    async def run(self, func, *args, **kwargs):
+        """在数据库线程中执行 func(*args, **kwargs) 并返回结果"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_pending)
+
+        enqueued_at = time.monotonic()
+        async with self._slots:
+            self.pending += 1
+            self.submitted += 1
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(
+                    self._executor, partial(self._timed, enqueued_at, func, *args, **kwargs)
+                )
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.pending -= 1
+                self.completed += 1
+
+    def stats(self) -> dict:
+        """返回排队等待与执行耗时统计"""
+        done = self.completed or 1
+        return {
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait / done * 1000, 3),
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "avg_run_ms": round(self.total_run / done * 1000, 3),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+db_executor = DBExecutor()
+
+async def run_db(func, *args, **kwargs):
+    """快捷方式：await run_db(add_record, chat_id, record)"""
+    return await db_executor.run(func, *args, **kwargs)
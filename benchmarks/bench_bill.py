@@ -0,0 +1,125 @@
+"""
+账单渲染基准：对比旧版 generate_bill（读取全部记录，多次遍历求和、排序，逐行解析时间字符串）
+与新版（汇总表 + 索引取最新 N 条，时间已截取为 HH:MM:SS）渲染一份完整账单的耗时
+新版绕过渲染缓存，测的是缓存未命中时的开销
+
+用法: python benchmarks/bench_bill.py [记录数 ...]   默认 10000 100000
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import report  # noqa: E402
+from report import format_number  # noqa: E402
+
+ROUNDS = 20
+
+def seed(chat_id, n):
+    """入款与下发按 handlers 的实际格式写入时间（入款 HH:MM:SS，下发 MM-DD HH:MM:SS）"""
+    names = [f"客户{i}" for i in range(50)]
+    for i in range(n):
+        r_type = "入款" if random.random() < 0.7 else "下发"
+        rmb = float(random.randint(100, 50000))
+        clock = f"{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}"
+        db.add_record(chat_id, {
+            "type": r_type,
+            "user": "bench",
+            "display_name": random.choice(names),
+            "amount_rmb": rmb,
+            "amount_usd": rmb / 7.2,
+            "rate": 7.2,
+            "operator": "bench",
+            "time": clock if r_type == "入款" else f"10-17 {clock}",
+            "msg_id": i,
+        })
+
+# ---------- 旧版实现（保留用于对比） ----------
+def legacy_format_time(dt):
+    if isinstance(dt, str):
+        try:
+            if len(dt) == 8 and ":" in dt:
+                return dt
+            elif " " in dt:
+                for fmt in ("%Y-%m-%d %H:%M:%S", "%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S"):
+                    try:
+                        return datetime.strptime(dt, fmt).strftime("%H:%M:%S")
+                    except ValueError:
+                        continue
+            if ":" in dt:
+                time_match = re.search(r'(\d{1,2}:\d{1,2}:\d{1,2})', dt)
+                if time_match:
+                    return time_match.group(1)
+        except Exception:
+            return dt
+    return str(dt)
+
+def old_bill(chat_id):
+    group_conf = db.get_group_config(chat_id)
+    rate_fixed = group_conf["rate"]
+    income, payout = [], []
+    for r_type, _, name, rmb, usd, rate, _, time_str in db.get_records(chat_id):
+        formatted = legacy_format_time(time_str)
+        if r_type == "入款":
+            income.append((formatted, rmb, usd, name, rate, time_str))
+        elif r_type == "下发":
+            payout.append((formatted, rmb, usd, name, time_str))
+
+    latest_users = []
+    for rec in sorted(income, key=lambda x: x[5], reverse=True):
+        if rec[3] not in latest_users:
+            latest_users.append(rec[3])
+        if len(latest_users) >= 3:
+            break
+    text = "分类统计📟\n"
+    for name in latest_users:
+        text += f"{name} ➡️ {format_number(sum(r[1] for r in income if r[3] == name))} = {format_number(sum(r[2] for r in income if r[3] == name))}U\n"
+
+    income.sort(key=lambda x: x[5], reverse=True)
+    text += f"\n今日入款（{len(income)}笔）\n"
+    for time_str, rmb, usd, name, rate, _ in income[:5]:
+        text += f"{time_str}  {format_number(rmb)}/{format_number(rate)}={format_number(rmb / rate)}  {name}\n"
+    payout.sort(key=lambda x: x[4], reverse=True)
+    text += f"\n今日下发（{len(payout)}笔）\n"
+    for time_str, rmb, usd, name, _ in payout[:3]:
+        text += f"{time_str}  {format_number(rmb)}/{format_number(rate_fixed)}={format_number(usd)}  {name}\n"
+
+    total_income = sum(r[1] for r in income), sum(r[2] for r in income)
+    total_payout = sum(r[1] for r in payout), sum(r[2] for r in payout)
+    return text + f"{total_income} {total_payout}"
+
+def new_bill(chat_id):
+    group_conf = db.get_group_config(chat_id)
+    day = db.get_accounting_day(group_conf["daily_reset_hour"])
+    return report._render_bill(chat_id, group_conf, day)
+
+def bench(label, func, chat_id):
+    func(chat_id)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(chat_id)
+    per_call = (time.perf_counter() - start) / ROUNDS * 1000
+    print(f"  {label:<8} {per_call:10.3f} ms/次")
+    return per_call
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    db.init_db()
+    for index, n in enumerate(sizes):
+        chat_id = -100000 - index
+        start = time.perf_counter()
+        seed(chat_id, n)
+        print(f"{n} 条记录（写入耗时 {time.perf_counter() - start:.1f}s）")
+        old = bench("旧账单", old_bill, chat_id)
+        new = bench("新账单", new_bill, chat_id)
+        print(f"  加速比   {old / new:10.1f}x")
+
+if __name__ == "__main__":
+    main()
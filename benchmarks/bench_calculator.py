@@ -0,0 +1,60 @@
+"""
+计算器耗时检查：正常表达式与恶意表达式（超大乘方、超长、深层嵌套）都应在有限时间内返回
+
+用法: python benchmarks/bench_calculator.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculator import CalcError, evaluate  # noqa: E402
+
+TIME_LIMIT = 0.05  # 单个表达式（含首次解析）允许的最长耗时（秒）
+
+CASES = [
+    ("1+2*3", 7),
+    ("(100+50)/3", 50),
+    ("1000*7.2", 7200.0),
+    ("10//3", 3),
+    ("2**10", 1024),
+    ("-5+2", -3),
+    ("9**9**9", CalcError),
+    ("(9**9)**(9**9)", CalcError),
+    ("99999999**99999999", CalcError),
+    ("2**-1**-1**-1", 0.5),
+    ("0.000001**-64", CalcError),
+    ("1/0", CalcError),
+    ("9" * 200, CalcError),
+    ("1+" * 150 + "1", CalcError),
+    ("+".join(["100"] * 34), 3400),
+    ("+".join(["12.5"] * 40), 500.0),
+    ("1-" * 99 + "1", -98),
+    ("-" * 100 + "1", CalcError),
+    ("(" * 99 + "1" + ")" * 99, 1),
+    ("1e308*10", CalcError),
+    ("(-8)**(1/3)", CalcError),
+]
+
+def main():
+    evaluate.cache_clear()
+    worst = 0.0
+    for expression, expected in CASES:
+        start = time.perf_counter()
+        try:
+            result = evaluate(expression)
+        except CalcError as e:
+            result = e
+        elapsed = time.perf_counter() - start
+        worst = max(worst, elapsed)
+
+        ok = isinstance(result, CalcError) if expected is CalcError else result == expected
+        label = expression if len(expression) <= 30 else expression[:27] + "..."
+        print(f"{'OK ' if ok else 'BAD'} {label:<32} {elapsed * 1000:8.3f} ms  {result!r}")
+        assert ok, expression
+        assert elapsed < TIME_LIMIT, expression
+    print(f"最长耗时 {worst * 1000:.3f} ms（上限 {TIME_LIMIT * 1000:.0f} ms）")
+
+if __name__ == "__main__":
+    main()
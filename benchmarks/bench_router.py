@@ -0,0 +1,93 @@
+"""
+消息分发基准：对比旧版逐个正则尝试的顺序匹配与新的按首字符查表路由
+消息构成按群里的实际情况：绝大多数是普通聊天，少量记账、下发、设置类命令
+
+用法: python benchmarks/bench_router.py [消息数]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handlers import accounting as acc  # noqa: E402
+
+CHATTER = [
+    "好的", "收到", "老板今天几点下班", "ok", "👍", "稍等一下", "已经转了，麻烦看一下",
+    "hello", "明天再说吧", "这个汇率多少", "哈哈哈", "TRX 到账了吗", "Quick question",
+    "1号客户那边还没回", "(图片)", "2000 到了吗",
+]
+COMMANDS = [
+    "+1000", "张三+500", "李四+2000/7.1", "+0", "下发1000", "下发100U", "设置汇率7.25",
+    "设置费率1", "撤销", "显示操作人", "显示地址", "100*7.2", "(100+50)/3",
+    "TXYZopNoEdCfZkHFcN5yYhZ7RsTJP5BkzU",
+]
+
+# 只用于核对分发结果：前缀重叠、容易被误判的输入
+EDGE_CASES = [
+    "撤销+100", "撤销张三+100/7.2", "撤销 张三", "撤销100", "撤销abc", "开始", "开始吧",
+    "+0", "+01", "设置汇率", "下发", "下发-50", "开启实时账单", "关闭实时账单", "删除账单",
+    "设置操作人 @bob", "删除操作人 @bob", "UQ", "T", "1+1", "张三+", "+",
+]
+
+def mixed_messages(n, command_ratio=0.1):
+    return [random.choice(COMMANDS) if random.random() < command_ratio else random.choice(CHATTER) for _ in range(n)]
+
+# 旧版 handle_message 的匹配顺序（只保留匹配部分），返回对应的新处理函数
+def legacy_resolve(text):
+    if text == "开始":
+        return acc.handle_start
+    if acc.tron_pattern.match(text) or acc.ton_pattern.match(text):
+        return acc.handle_address_check
+    if acc.bill_pattern.match(text):
+        return acc.handle_show_bill
+    if acc.calc_pattern.match(text):
+        return acc.handle_calc
+    for handler, pattern in (
+        (acc.handle_quick_income, acc.quick_pattern), (acc.handle_payout, acc.send_pattern),
+        (acc.handle_set_rate, acc.set_rate_pattern), (acc.handle_set_fee, acc.set_fee_pattern),
+        (acc.handle_set_daily_reset, acc.set_reset_pattern), (acc.handle_live_bill, acc.live_bill_pattern),
+        (acc.handle_delete_bill, acc.del_bill_pattern),
+    ):
+        if pattern.match(text):
+            return handler
+    if text.startswith("撤销"):
+        return acc.handle_cancel
+    for handler, pattern in (
+        (acc.handle_add_operator, acc.add_op_pattern), (acc.handle_remove_operator, acc.del_op_pattern),
+        (acc.handle_show_operators, acc.show_op_pattern), (acc.handle_add_address, acc.add_addr_pattern),
+        (acc.handle_delete_address, acc.del_addr_pattern), (acc.handle_show_addresses, acc.show_addr_pattern),
+    ):
+        if pattern.match(text):
+            return handler
+    return None
+
+def new_resolve(text):
+    resolved = acc.router.resolve(text)
+    return resolved[0] if resolved else None
+
+def bench(label, func, messages):
+    start = time.perf_counter()
+    for text in messages:
+        func(text)
+    per_msg = (time.perf_counter() - start) / len(messages) * 1e6
+    print(f"{label:<8} {per_msg:8.3f} µs/条")
+    return per_msg
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    messages = mixed_messages(n)
+
+    # 两种方式对每条消息选中的处理函数必须一致
+    for text in set(CHATTER + COMMANDS + EDGE_CASES):
+        assert legacy_resolve(text) is new_resolve(text), text
+
+    old = bench("顺序匹配", legacy_resolve, messages)
+    new = bench("查表路由", acc.router.resolve, messages)
+    print(f"加速比   {old / new:8.1f}x  （{n} 条消息，命令约占 10%）")
+
+if __name__ == "__main__":
+    main()
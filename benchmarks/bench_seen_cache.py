@@ -0,0 +1,76 @@
+"""
+已处理交易缓存检查：单地址上限、全局预算、TTL 过期，以及一次推送大量交易时保留的是最新的交易
+
+用法: python benchmarks/bench_seen_cache.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tron_listener  # noqa: E402
+from seen_cache import SeenTxCache  # noqa: E402
+
+def check_per_address_limit():
+    cache = SeenTxCache(per_address=200, max_total=50_000)
+    for i in range(1000):
+        cache.add("TA", f"tx{i}")
+    assert len(cache) == 200, len(cache)
+    assert cache.contains("TA", "tx999")
+    assert not cache.contains("TA", "tx799")
+    assert cache.contains("TA", "tx800")
+    print(f"OK  单地址上限        保留 {len(cache)} 条，淘汰 {cache.evictions} 条")
+
+def check_total_budget():
+    cache = SeenTxCache(per_address=200, max_total=1000)
+    for a in range(20):
+        for i in range(100):
+            cache.add(f"T{a}", f"tx{i}")
+    assert len(cache) == 1000, len(cache)
+    assert cache.address_count() == 10, cache.address_count()
+    # 最久未使用的地址先被淘汰
+    assert not cache.contains("T0", "tx99")
+    assert cache.contains("T19", "tx0")
+    print(f"OK  全局预算          {cache.address_count()} 个地址 {len(cache)} 条")
+
+def check_ttl():
+    cache = SeenTxCache(ttl=0.05)
+    cache.add("TA", "old")
+    time.sleep(0.1)
+    cache.add("TA", "new")
+    assert not cache.contains("TA", "old")
+    assert cache.contains("TA", "new")
+    assert len(cache) == 1, len(cache)
+    print("OK  TTL 过期          过期交易已移除")
+
+def check_burst_order():
+    # 一次推送 1000 笔交易：new_tx_list 与 API 返回顺序一致，按时间从新到旧
+    tron_listener.processed_tx_cache = cache = SeenTxCache(per_address=200)
+    listener = tron_listener.TronListener.__new__(tron_listener.TronListener)
+    listener._pending_seen = []
+    listener._pending_cursors = {}
+    listener.balances = {}
+    new_tx_list = [
+        {"transaction_id": f"tx{i}", "block_timestamp": 1_700_000_000_000 + i}
+        for i in reversed(range(1000))
+    ]
+    listener._record_processed("TA", new_tx_list, new_tx_list[0]["block_timestamp"])
+    assert tron_listener.last_tx_map["TA"] == "tx999"
+    assert cache.contains("TA", "tx999"), "游标所在的最新交易被淘汰"
+    assert cache.contains("TA", "tx800")
+    assert not cache.contains("TA", "tx799")
+    assert not cache.contains("TA", "tx0")
+    assert len(listener._pending_seen) == 1000
+    print(f"OK  批量推送顺序      保留最新的 {len(cache)} 笔（tx800..tx999）")
+
+def main():
+    check_per_address_limit()
+    check_total_budget()
+    check_ttl()
+    check_burst_order()
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,19 @@ import os
 import asyncio
 import threading
 import logging
+from telegram.error import BadRequest
 from telegram.ext import Application, MessageHandler, filters, CallbackQueryHandler
 from handlers.accounting import handle_message
-from db import init_db
+from db import init_db, close_db
+from async_db import run_db, db_executor
+from export import export_records
 import config
 import full_bill
 
 # 导入 TRON 监听器
 from tron_listener import TronListener
+from outbox import Outbox
+from live_bill import LiveBill
 
 # 配置日志
 logging.basicConfig(
@@ -30,34 +35,71 @@ async def callback_handler(update, context):
     if query.data == "refresh_bill":
         from report import generate_bill
         chat_id = query.message.chat_id
-        bill_text, bill_markup = generate_bill(chat_id)
-        await query.edit_message_text(text=bill_text, reply_markup=bill_markup)
+        bill_text, bill_markup = await run_db(generate_bill, chat_id)
+        # 账单内容未变化时不再调用编辑接口（Telegram 会去掉消息末尾的空白）
+        if bill_text.strip() == (query.message.text or "").strip():
+            return
+        try:
+            await query.edit_message_text(text=bill_text, reply_markup=bill_markup)
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
     elif query.data == "export_excel":
-        await query.edit_message_text(text="✅ Excel导出功能即将实现")
+        # 导出在独立线程中逐行写入临时文件，不阻塞事件循环和数据库线程
+        chat_id = query.message.chat_id
+        try:
+            path = await asyncio.to_thread(export_records, chat_id, "xlsx")
+        except Exception as e:
+            logger.error(f"聊天 {chat_id} 导出账单失败: {e}")
+            await context.bot.send_message(chat_id=chat_id, text="❌ 导出失败，请稍后重试")
+            return
+        try:
+            with open(path, "rb") as f:
+                await context.bot.send_document(chat_id=chat_id, document=f, filename=f"账单_{chat_id}.xlsx")
+        finally:
+            os.remove(path)
 
 # ---------- 初始化数据库 ----------
 async def post_init(application):
-    await asyncio.to_thread(init_db)
+    await run_db(init_db)
     application.bot_data["SUPER_ADMIN_IDS"] = config.SUPER_ADMIN_IDS
+
+    # 统一发送队列（账单与钱包报账）
+    outbox = Outbox(application.bot)
+    application.bot_data["outbox"] = outbox
+    application.bot_data["live_bill"] = LiveBill(outbox)
     
     # 启动 TRON 监听器
-    tron_listener = TronListener(application.bot)
+    tron_listener = TronListener(application.bot, outbox)
     application.bot_data["tron_listener"] = tron_listener
     asyncio.create_task(tron_listener.start_listening())
 
+# ---------- 退出清理 ----------
+async def post_shutdown(application):
+    tron_listener = application.bot_data.get("tron_listener")
+    if tron_listener:
+        await tron_listener.stop_listening()
+    outbox = application.bot_data.get("outbox")
+    if outbox:
+        await outbox.close()
+    logger.info(f"数据库线程统计: {db_executor.stats()}")
+    db_executor.shutdown()
+    close_db()
+
 # ---------- 后台启动 Flask ----------
 def start_flask():
     full_bill.run_flask()  # full_bill.py 中定义的 run_flask()
 
 # ---------- 主函数 ----------
 def main():
-    # 后台线程启动 Flask
-    flask_thread = threading.Thread(target=start_flask, daemon=True)
-    flask_thread.start()
-    print("Flask 网页服务已启动，访问 https://bot.ym2017.club/")
+    # 后台线程启动 Flask（external 模式下由 gunicorn 单独进程提供网页服务）
+    if config.BILL_SERVER_MODE == "thread":
+        flask_thread = threading.Thread(target=start_flask, daemon=True)
+        flask_thread.start()
+        print("Flask 网页服务已启动，访问 https://bot.ym2017.club/")
 
     # 创建 Telegram Bot Application
-    application = Application.builder().token(config.BOT_TOKEN).post_init(post_init).build()
+    application = Application.builder().token(config.BOT_TOKEN).post_init(post_init).post_shutdown(post_shutdown).build()
     
     # 添加消息处理器
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
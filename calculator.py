@@ -0,0 +1,93 @@
+import ast
+import math
+import operator
+from functools import lru_cache
+from typing import Union
+
+Number = Union[int, float]
+
+# ---------- 限制 ----------
+MAX_EXPRESSION_LENGTH = 200   # 表达式最大字符数
+MAX_MAGNITUDE = 1e15          # 操作数与中间结果的绝对值上限
+MAX_EXPONENT = 64             # 乘方指数的绝对值上限
+MAX_DEPTH = 32                # 最大嵌套层数（一元运算、右侧操作数；1+2+3+... 这样的长链不计）
+
+class CalcError(ValueError):
+    """表达式不合法或超出限制"""
+
+BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Pow: operator.pow,
+}
+UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+def _check(value: Number) -> Number:
+    if isinstance(value, float) and not math.isfinite(value):
+        raise CalcError("结果无效")
+    if abs(value) > MAX_MAGNITUDE:
+        raise CalcError("数值过大")
+    return value
+
+def _power(base: Number, exponent: Number) -> Number:
+    """先估算结果的量级，超限时不做实际计算（避免 9**9**9 这类输入占满 CPU）"""
+    if abs(exponent) > MAX_EXPONENT:
+        raise CalcError("指数过大")
+    if base == 0 and exponent < 0:
+        raise CalcError("除数不能为 0")
+    if abs(base) > 1 and exponent > 0 and exponent * math.log10(abs(base)) > math.log10(MAX_MAGNITUDE):
+        raise CalcError("数值过大")
+    try:
+        result = base ** exponent
+    except OverflowError as e:
+        raise CalcError("数值过大") from e
+    if isinstance(result, complex):
+        raise CalcError("结果无效")
+    return result
+
+def _binary(op: ast.operator, left: Number, right: Number) -> Number:
+    if isinstance(op, ast.Pow):
+        return _check(_power(left, right))
+    if isinstance(op, (ast.Div, ast.FloorDiv)) and right == 0:
+        raise CalcError("除数不能为 0")
+    return _check(BINARY_OPS[type(op)](left, right))
+
+def _eval(node: ast.AST, depth: int = 0) -> Number:
+    if depth > MAX_DEPTH:
+        raise CalcError("表达式嵌套过深")
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return _check(node.value)
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+        # 左结合的长链（连加多笔金额）在语法树中是向左的深层嵌套，逐个计算，不计入嵌套层数
+        chain = []
+        while isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+            chain.append(node)
+            node = node.left
+        value = _eval(node, depth + 1)
+        for binop in reversed(chain):
+            value = _binary(binop.op, value, _eval(binop.right, depth + 1))
+        return value
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPS:
+        return UNARY_OPS[type(node.op)](_eval(node.operand, depth + 1))
+    raise CalcError("不支持的表达式")
+
+@lru_cache(maxsize=1024)
+def evaluate(expression: str) -> Number:
+    """
+    计算四则运算表达式（+ - * / // ** 与括号），只解析语法树，不执行任意代码
+    表达式长度、操作数与中间结果大小、指数、嵌套层数均有上限，超限抛出 CalcError
+    最近的表达式结果会被缓存
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalcError("表达式过长")
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except (SyntaxError, ValueError, RecursionError, MemoryError) as e:
+        raise CalcError("表达式不合法") from e
+    return _eval(tree.body)
@@ -9,3 +9,30 @@ SUPER_ADMIN_IDS = [int(id) for id in os.getenv("SUPER_ADMIN_IDS", "").split(",")
 
 # 数据库配置
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///bot.db")
+
+# TronGrid 配置
+TRONGRID_API_KEYS = [key.strip() for key in os.getenv("TRONGRID_API_KEYS", "").split(",") if key.strip()]
+TRONGRID_RPS = float(os.getenv("TRONGRID_RPS", "10"))  # 全局每秒请求数
+TRONGRID_BURST = int(os.getenv("TRONGRID_BURST", "10"))  # 令牌桶容量
+TRONGRID_MAX_CONCURRENCY = int(os.getenv("TRONGRID_MAX_CONCURRENCY", "10"))  # 并发上限
+TRON_MIN_POLL_INTERVAL = float(os.getenv("TRON_MIN_POLL_INTERVAL", "15"))  # 活跃地址的最短轮询间隔（秒）
+TRON_MAX_POLL_INTERVAL = float(os.getenv("TRON_MAX_POLL_INTERVAL", "180"))  # 空闲地址的最长轮询间隔（秒）
+TRON_DERIVED_BALANCE = os.getenv("TRON_DERIVED_BALANCE", "0").lower() in ("1", "true", "yes")  # 由交易流水推算余额，省去每次查询余额
+TRON_BALANCE_RECONCILE_INTERVAL = float(os.getenv("TRON_BALANCE_RECONCILE_INTERVAL", "1800"))  # 推算余额与链上余额的核对间隔（秒）
+TRONGRID_API_URL = os.getenv("TRONGRID_API_URL", "https://api.trongrid.io").rstrip("/")  # 可指向本地模拟节点
+TRON_INGEST_MODE = os.getenv("TRON_INGEST_MODE", "poll")  # poll: 按地址轮询; events: 扫描 USDT 合约 Transfer 事件
+
+# Telegram 发送频率限制
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "25"))  # 全局每秒消息数
+TG_GLOBAL_BURST = int(os.getenv("TG_GLOBAL_BURST", "30"))
+TG_CHAT_RATE = float(os.getenv("TG_CHAT_RATE", "0.33"))  # 每个群每秒消息数（约 20 条/分钟）
+TG_CHAT_BURST = int(os.getenv("TG_CHAT_BURST", "3"))
+BILL_DEBOUNCE_SECONDS = float(os.getenv("BILL_DEBOUNCE_SECONDS", "1.0"))  # 连续记账时合并账单渲染的等待时间
+
+# 完整账单网页
+BILL_SERVER_MODE = os.getenv("BILL_SERVER_MODE", "thread")  # thread: 在 bot 进程内后台线程运行; external: 由 gunicorn 单独进程运行
+BILL_HOST = os.getenv("BILL_HOST", "0.0.0.0")
+BILL_PORT = int(os.getenv("BILL_PORT", "8000"))
+BILL_WORKERS = int(os.getenv("BILL_WORKERS", str(min(os.cpu_count() or 1, 4) * 2)))  # gunicorn 工作进程数
+BILL_THREADS = int(os.getenv("BILL_THREADS", "4"))  # 每个工作进程的线程数
+BILL_PAGE_CACHE_BYTES = int(os.getenv("BILL_PAGE_CACHE_BYTES", str(32 * 1024 * 1024)))  # 每个进程缓存已渲染页面的字节数上限
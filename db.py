@@ -1,208 +1,654 @@
+import os
 import sqlite3
-from datetime import datetime
+import threading
+import queue
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import pytz
 
+# ---------- 连接池 ----------
+DB_PATH = os.getenv("DB_PATH", "bot.db")
+POOL_SIZE = 8  # 池中保留的空闲连接数上限
+
+# SQLite 连接参数：WAL 日志 + NORMAL 同步，读写互不阻塞，每次提交不再强制 fsync
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",      # 约 16MB 页缓存
+    "PRAGMA mmap_size=67108864",     # 64MB 内存映射
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+class ConnectionPool:
+    """长连接池：连接在 bot 事件循环、Flask 线程和 TRON 监听器之间复用"""
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pool = ConnectionPool(DB_PATH)
+
+@contextmanager
+def get_conn():
+    """从连接池借出连接，正常退出时提交，异常时回滚，最后归还连接"""
+    conn = _pool.acquire()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _pool.release(conn)
+
+def close_db():
+    """关闭池中所有空闲连接（进程退出时调用）"""
+    _pool.close_all()
+
 # 初始化数据库
 def init_db():
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    # 创建群组配置表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS group_configs (
-            chat_id INTEGER PRIMARY KEY,
-            rate REAL DEFAULT 7.2,
-            fee REAL DEFAULT 0,
-            daily_reset_hour INTEGER DEFAULT 0
-        )
-    ''')
-    
-    # 创建记账记录表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS accounting_records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+    with get_conn() as conn:
+        cursor = conn.cursor()
+
+        # 创建群组配置表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS group_configs (
+                chat_id INTEGER PRIMARY KEY,
+                rate REAL DEFAULT 7.2,
+                fee REAL DEFAULT 0,
+                daily_reset_hour INTEGER DEFAULT 0
+            )
+        ''')
+
+        # 创建记账记录表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS accounting_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER,
+                type TEXT,
+                user TEXT,
+                display_name TEXT,
+                amount_rmb REAL,
+                amount_usd REAL,
+                rate REAL,
+                operator TEXT,
+                time TEXT,
+                msg_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (chat_id) REFERENCES group_configs (chat_id)
+            )
+        ''')
+
+        # 创建操作员表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS operators (
+                chat_id INTEGER,
+                username TEXT,
+                PRIMARY KEY (chat_id, username),
+                FOREIGN KEY (chat_id) REFERENCES group_configs (chat_id)
+            )
+        ''')
+
+        # 创建钱包地址表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS wallet_addresses (
+                chat_id INTEGER,
+                address TEXT,
+                remark TEXT,
+                PRIMARY KEY (chat_id, address),
+                FOREIGN KEY (chat_id) REFERENCES group_configs (chat_id)
+            )
+        ''')
+
+        _migrate(cursor)
+
+# ---------- 结构迁移 ----------
+# 每一项是一个版本的步骤列表（SQL 语句或接收 cursor 的函数），
+# 已执行到的版本号记录在 PRAGMA user_version 中
+def _backfill_accounting_day(cursor):
+    """按各群的日切小时（北京时间）为历史记录补上账期"""
+    cursor.execute(
+        '''UPDATE accounting_records SET accounting_day = date(
+            created_at, '+8 hours',
+            '-' || COALESCE(
+                (SELECT daily_reset_hour FROM group_configs g WHERE g.chat_id = accounting_records.chat_id), 0
+            ) || ' hours'
+        ) WHERE accounting_day IS NULL'''
+    )
+
+SCHEMA_MIGRATIONS = [
+    # 1: 记账记录索引（账单取最新 N 条、撤销按 msg_id 删除、按显示名刷新汇总）
+    [
+        "CREATE INDEX IF NOT EXISTS idx_records_chat_type_created ON accounting_records (chat_id, type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_records_chat_msg ON accounting_records (chat_id, msg_id)",
+        "CREATE INDEX IF NOT EXISTS idx_records_chat_type_name ON accounting_records (chat_id, type, display_name)",
+    ],
+    # 2: 按日切分账期，汇总表改为按账期维护（同时作为每日汇总表）
+    [
+        "ALTER TABLE accounting_records ADD COLUMN accounting_day TEXT",
+        _backfill_accounting_day,
+        "DROP INDEX IF EXISTS idx_records_chat_type_created",
+        "CREATE INDEX IF NOT EXISTS idx_records_chat_day_type_created ON accounting_records (chat_id, accounting_day, type, created_at)",
+        "DROP TABLE IF EXISTS ledger_totals",
+        "DROP TABLE IF EXISTS ledger_user_totals",
+        '''CREATE TABLE ledger_totals (
             chat_id INTEGER,
+            accounting_day TEXT,
             type TEXT,
-            user TEXT,
-            display_name TEXT,
-            amount_rmb REAL,
-            amount_usd REAL,
-            rate REAL,
-            operator TEXT,
-            time TEXT,
-            msg_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (chat_id) REFERENCES group_configs (chat_id)
-        )
-    ''')
-    
-    # 创建操作员表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS operators (
-            chat_id INTEGER,
-            username TEXT,
-            PRIMARY KEY (chat_id, username),
-            FOREIGN KEY (chat_id) REFERENCES group_configs (chat_id)
-        )
-    ''')
-    
-    # 创建钱包地址表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS wallet_addresses (
+            total_rmb REAL DEFAULT 0,
+            total_usd REAL DEFAULT 0,
+            count INTEGER DEFAULT 0,
+            PRIMARY KEY (chat_id, accounting_day, type)
+        )''',
+        # last_record_id 用于分类统计取最新的几个人
+        '''CREATE TABLE ledger_user_totals (
             chat_id INTEGER,
+            accounting_day TEXT,
+            type TEXT,
+            display_name TEXT,
+            total_rmb REAL DEFAULT 0,
+            total_usd REAL DEFAULT 0,
+            count INTEGER DEFAULT 0,
+            last_record_id INTEGER,
+            PRIMARY KEY (chat_id, accounting_day, type, display_name)
+        )''',
+        lambda cursor: _rebuild_ledger(cursor),
+    ],
+    # 3: TRON 监听器状态（已推送交易 + 每个地址的拉取游标）
+    [
+        '''CREATE TABLE IF NOT EXISTS tron_seen_txs (
             address TEXT,
-            remark TEXT,
-            PRIMARY KEY (chat_id, address),
-            FOREIGN KEY (chat_id) REFERENCES group_configs (chat_id)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+            tx_id TEXT,
+            block_timestamp INTEGER,
+            seen_at INTEGER,
+            PRIMARY KEY (address, tx_id)
+        )''',
+        "CREATE INDEX IF NOT EXISTS idx_tron_seen_address_ts ON tron_seen_txs (address, block_timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_tron_seen_seen_at ON tron_seen_txs (seen_at)",
+        '''CREATE TABLE IF NOT EXISTS tron_cursors (
+            address TEXT PRIMARY KEY,
+            last_timestamp INTEGER,
+            last_tx_id TEXT
+        )''',
+    ],
+    # 4: 实时账单开关（开启后原地编辑同一条账单消息）
+    [
+        "ALTER TABLE group_configs ADD COLUMN live_bill INTEGER DEFAULT 0",
+    ],
+    # 5: 账本版本号（记账、删账或改汇率/费率/日切时递增，用于账单缓存失效）
+    [
+        "ALTER TABLE group_configs ADD COLUMN ledger_version INTEGER DEFAULT 0",
+    ],
+    # 6: 统一的整数时间戳（秒），排序、按时间范围筛选都走索引，不再比较格式不一的 time 字符串
+    [
+        "ALTER TABLE accounting_records ADD COLUMN created_ts INTEGER",
+        "UPDATE accounting_records SET created_ts = CAST(strftime('%s', created_at) AS INTEGER) WHERE created_ts IS NULL",
+        "DROP INDEX IF EXISTS idx_records_chat_day_type_created",
+        "CREATE INDEX IF NOT EXISTS idx_records_chat_day_type_ts ON accounting_records (chat_id, accounting_day, type, created_ts)",
+        "CREATE INDEX IF NOT EXISTS idx_records_chat_ts ON accounting_records (chat_id, created_ts)",
+    ],
+    # 7: 完整账单按类型分页（时间范围 + 游标翻页）
+    [
+        "CREATE INDEX IF NOT EXISTS idx_records_chat_type_ts ON accounting_records (chat_id, type, created_ts, id)",
+    ],
+    # 8: 账本最后修改时间（完整账单网页的 Last-Modified）
+    [
+        "ALTER TABLE group_configs ADD COLUMN ledger_updated_at INTEGER",
+    ],
+]
 
-# 群组配置相关函数
-def get_group_config(chat_id):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT rate, fee, daily_reset_hour FROM group_configs WHERE chat_id = ?", 
+def _migrate(cursor):
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for target, steps in enumerate(SCHEMA_MIGRATIONS[version:], start=version + 1):
+        for step in steps:
+            if callable(step):
+                step(cursor)
+            else:
+                cursor.execute(step)
+        cursor.execute(f"PRAGMA user_version = {target}")
+
+# ---------- 账期（日切） ----------
+def get_accounting_day(reset_hour, now=None):
+    """北京时间减去日切小时后的日期即为账期，返回 'YYYY-MM-DD'"""
+    tz = pytz.timezone('Asia/Shanghai')
+    now = now.astimezone(tz) if now else datetime.now(tz)
+    return (now - timedelta(hours=reset_hour or 0)).strftime("%Y-%m-%d")
+
+def _current_accounting_day(cursor, chat_id, now=None):
+    row = cursor.execute(
+        "SELECT daily_reset_hour FROM group_configs WHERE chat_id = ?",
         (chat_id,)
+    ).fetchone()
+    return get_accounting_day(row[0] if row else 0, now)
+
+# ---------- 账本汇总维护 ----------
+def _rebuild_ledger(cursor, chat_id=None):
+    """根据原始记录重建汇总表（chat_id 为 None 时重建全部群组）"""
+    where, params = ("WHERE chat_id = ?", (chat_id,)) if chat_id is not None else ("", ())
+    cursor.execute(f"DELETE FROM ledger_totals {where}", params)
+    cursor.execute(f"DELETE FROM ledger_user_totals {where}", params)
+    cursor.execute(
+        f'''INSERT INTO ledger_totals (chat_id, accounting_day, type, total_rmb, total_usd, count)
+        SELECT chat_id, accounting_day, type, SUM(amount_rmb), SUM(amount_usd), COUNT(*)
+        FROM accounting_records {where} GROUP BY chat_id, accounting_day, type''',
+        params
+    )
+    cursor.execute(
+        f'''INSERT INTO ledger_user_totals
+        (chat_id, accounting_day, type, display_name, total_rmb, total_usd, count, last_record_id)
+        SELECT chat_id, accounting_day, type, display_name, SUM(amount_rmb), SUM(amount_usd), COUNT(*), MAX(id)
+        FROM accounting_records {where} GROUP BY chat_id, accounting_day, type, display_name''',
+        params
     )
-    row = cursor.fetchone()
-    
-    if row:
-        result = {"rate": row[0], "fee": row[1], "daily_reset_hour": row[2]}
-    else:
-        # 创建默认配置
-        cursor.execute(
-            "INSERT INTO group_configs (chat_id, rate, fee, daily_reset_hour) VALUES (?, ?, ?, ?)",
-            (chat_id, 7.2, 0, 0)
-        )
-        conn.commit()
-        result = {"rate": 7.2, "fee": 0, "daily_reset_hour": 0}
-    
-    conn.close()
-    return result
 
-def set_group_rate(chat_id, rate):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
+def _ledger_add(cursor, chat_id, day, r_type, display_name, amount_rmb, amount_usd, record_id):
+    cursor.execute(
+        '''INSERT INTO ledger_totals (chat_id, accounting_day, type, total_rmb, total_usd, count)
+        VALUES (?, ?, ?, ?, ?, 1)
+        ON CONFLICT (chat_id, accounting_day, type) DO UPDATE SET
+            total_rmb = total_rmb + excluded.total_rmb,
+            total_usd = total_usd + excluded.total_usd,
+            count = count + 1''',
+        (chat_id, day, r_type, amount_rmb, amount_usd)
+    )
     cursor.execute(
-        "INSERT OR REPLACE INTO group_configs (chat_id, rate) VALUES (?, ?)",
-        (chat_id, rate)
+        '''INSERT INTO ledger_user_totals
+        (chat_id, accounting_day, type, display_name, total_rmb, total_usd, count, last_record_id)
+        VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+        ON CONFLICT (chat_id, accounting_day, type, display_name) DO UPDATE SET
+            total_rmb = total_rmb + excluded.total_rmb,
+            total_usd = total_usd + excluded.total_usd,
+            count = count + 1,
+            last_record_id = MAX(last_record_id, excluded.last_record_id)''',
+        (chat_id, day, r_type, display_name, amount_rmb, amount_usd, record_id)
     )
-    conn.commit()
-    conn.close()
 
-def set_group_fee(chat_id, fee):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
+def _ledger_remove(cursor, chat_id, day, r_type, display_name, amount_rmb, amount_usd):
+    """在原始记录删除之后调用，扣减汇总并刷新该显示名的最新记录 id"""
     cursor.execute(
-        "INSERT OR REPLACE INTO group_configs (chat_id, fee) VALUES (?, ?)",
-        (chat_id, fee)
+        '''UPDATE ledger_totals
+        SET total_rmb = total_rmb - ?, total_usd = total_usd - ?, count = count - 1
+        WHERE chat_id = ? AND accounting_day = ? AND type = ?''',
+        (amount_rmb, amount_usd, chat_id, day, r_type)
     )
-    conn.commit()
-    conn.close()
+    cursor.execute(
+        '''UPDATE ledger_user_totals
+        SET total_rmb = total_rmb - ?, total_usd = total_usd - ?, count = count - 1,
+            last_record_id = (
+                SELECT MAX(id) FROM accounting_records
+                WHERE chat_id = ? AND type = ? AND display_name = ? AND accounting_day = ?
+            )
+        WHERE chat_id = ? AND accounting_day = ? AND type = ? AND display_name = ?''',
+        (amount_rmb, amount_usd, chat_id, r_type, display_name, day, chat_id, day, r_type, display_name)
+    )
+    # 笔数归零时删除汇总行，顺便清掉浮点累计误差
+    cursor.execute("DELETE FROM ledger_totals WHERE chat_id = ? AND count <= 0", (chat_id,))
+    cursor.execute("DELETE FROM ledger_user_totals WHERE chat_id = ? AND count <= 0", (chat_id,))
 
-def set_group_daily_reset(chat_id, hour):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
+def _bump_ledger_version(cursor, chat_id):
+    """与数据修改在同一事务中递增账本版本号，并记录修改时间"""
     cursor.execute(
-        "INSERT OR REPLACE INTO group_configs (chat_id, daily_reset_hour) VALUES (?, ?)",
-        (chat_id, hour)
+        '''INSERT INTO group_configs (chat_id, ledger_version, ledger_updated_at) VALUES (?, 1, ?)
+        ON CONFLICT (chat_id) DO UPDATE SET
+            ledger_version = ledger_version + 1,
+            ledger_updated_at = excluded.ledger_updated_at''',
+        (chat_id, int(time.time()))
     )
-    conn.commit()
-    conn.close()
+
+# 群组配置相关函数
+def get_group_config(chat_id):
+    with get_conn() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT rate, fee, daily_reset_hour, live_bill, ledger_version FROM group_configs WHERE chat_id = ?",
+            (chat_id,)
+        )
+        row = cursor.fetchone()
+
+        if row:
+            return {
+                "rate": row[0], "fee": row[1], "daily_reset_hour": row[2],
+                "live_bill": bool(row[3]), "ledger_version": row[4] or 0,
+            }
+
+        # 创建默认配置
+        cursor.execute(
+            "INSERT INTO group_configs (chat_id, rate, fee, daily_reset_hour, live_bill, ledger_version) VALUES (?, ?, ?, ?, ?, ?)",
+            (chat_id, 7.2, 0, 0, 0, 0)
+        )
+        return {"rate": 7.2, "fee": 0, "daily_reset_hour": 0, "live_bill": False, "ledger_version": 0}
+
+# 只更新指定字段，保留群组的其它配置（INSERT OR REPLACE 会把其它字段重置为默认值）
+def set_group_rate(chat_id, rate):
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT INTO group_configs (chat_id, rate) VALUES (?, ?) ON CONFLICT (chat_id) DO UPDATE SET rate = excluded.rate",
+            (chat_id, rate)
+        )
+        _bump_ledger_version(conn.cursor(), chat_id)
+
+def set_group_fee(chat_id, fee):
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT INTO group_configs (chat_id, fee) VALUES (?, ?) ON CONFLICT (chat_id) DO UPDATE SET fee = excluded.fee",
+            (chat_id, fee)
+        )
+        _bump_ledger_version(conn.cursor(), chat_id)
+
+def set_group_daily_reset(chat_id, hour):
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT INTO group_configs (chat_id, daily_reset_hour) VALUES (?, ?) ON CONFLICT (chat_id) DO UPDATE SET daily_reset_hour = excluded.daily_reset_hour",
+            (chat_id, hour)
+        )
+        _bump_ledger_version(conn.cursor(), chat_id)
+
+def set_group_live_bill(chat_id, enabled):
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT INTO group_configs (chat_id, live_bill) VALUES (?, ?) ON CONFLICT (chat_id) DO UPDATE SET live_bill = excluded.live_bill",
+            (chat_id, int(enabled))
+        )
 
 # 记账记录相关函数
 def add_record(chat_id, record):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        '''INSERT INTO accounting_records 
-        (chat_id, type, user, display_name, amount_rmb, amount_usd, rate, operator, time, msg_id)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-        (chat_id, record["type"], record["user"], record["display_name"], 
-         record["amount_rmb"], record["amount_usd"], record["rate"], 
-         record["operator"], record["time"], record["msg_id"])
-    )
-    conn.commit()
-    conn.close()
+    """写入一条记录；时间戳（秒）与账期可由 record 指定，缺省取当前时间"""
+    ts = int(record.get("ts") or time.time())
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        day = record.get("accounting_day") or _current_accounting_day(
+            cursor, chat_id, datetime.fromtimestamp(ts, pytz.utc)
+        )
+        cursor.execute(
+            '''INSERT INTO accounting_records
+            (chat_id, type, user, display_name, amount_rmb, amount_usd, rate, operator, time, msg_id, accounting_day, created_ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            (chat_id, record["type"], record["user"], record["display_name"],
+             record["amount_rmb"], record["amount_usd"], record["rate"],
+             record["operator"], record["time"], record["msg_id"], day, ts)
+        )
+        _ledger_add(
+            cursor, chat_id, day, record["type"], record["display_name"],
+            record["amount_rmb"], record["amount_usd"], cursor.lastrowid
+        )
+        _bump_ledger_version(cursor, chat_id)
 
 def delete_records(chat_id):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "DELETE FROM accounting_records WHERE chat_id = ?",
-        (chat_id,)
-    )
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute(
+            "DELETE FROM accounting_records WHERE chat_id = ?",
+            (chat_id,)
+        )
+        conn.execute("DELETE FROM ledger_totals WHERE chat_id = ?", (chat_id,))
+        conn.execute("DELETE FROM ledger_user_totals WHERE chat_id = ?", (chat_id,))
+        _bump_ledger_version(conn.cursor(), chat_id)
     return "✅ 所有记账记录已删除"
 
 def remove_record_by_msgid(chat_id, msg_id):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "DELETE FROM accounting_records WHERE chat_id = ? AND msg_id = ?",
-        (chat_id, msg_id)
-    )
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        removed = cursor.execute(
+            "SELECT accounting_day, type, display_name, amount_rmb, amount_usd FROM accounting_records WHERE chat_id = ? AND msg_id = ?",
+            (chat_id, msg_id)
+        ).fetchall()
+        cursor.execute(
+            "DELETE FROM accounting_records WHERE chat_id = ? AND msg_id = ?",
+            (chat_id, msg_id)
+        )
+        for day, r_type, display_name, amount_rmb, amount_usd in removed:
+            _ledger_remove(cursor, chat_id, day, r_type, display_name, amount_rmb, amount_usd)
+        if removed:
+            _bump_ledger_version(cursor, chat_id)
     return "✅ 记录已删除"
 
 def get_records(chat_id):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT type, user, display_name, amount_rmb, amount_usd, rate, operator, time FROM accounting_records WHERE chat_id = ? ORDER BY created_at",
-        (chat_id,)
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    """全部记录（按时间正序），时间由时间戳换算为北京时间 'YYYY-MM-DD HH:MM:SS'"""
+    with get_conn() as conn:
+        cursor = conn.execute(
+            '''SELECT type, user, display_name, amount_rmb, amount_usd, rate, operator,
+                strftime('%Y-%m-%d %H:%M:%S', created_ts, 'unixepoch', '+8 hours')
+            FROM accounting_records WHERE chat_id = ? ORDER BY created_ts, id''',
+            (chat_id,)
+        )
+        return cursor.fetchall()
+
+def get_ledger_stamp(chat_id):
+    """(账本版本号, 最后修改时间戳)，用于账单缓存与 HTTP 条件请求；从未修改过时时间戳为 None"""
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT ledger_version, ledger_updated_at FROM group_configs WHERE chat_id = ?",
+            (chat_id,)
+        ).fetchone()
+    return ((row[0] or 0), row[1]) if row else (0, None)
+
+def get_ledger_totals(chat_id, day):
+    """
+    读取某个账期的汇总
+    返回格式: {'入款': {'total_rmb': ..., 'total_usd': ..., 'count': ...}, '下发': {...}}
+    """
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT type, total_rmb, total_usd, count FROM ledger_totals WHERE chat_id = ? AND accounting_day = ?",
+            (chat_id, day)
+        ).fetchall()
+    return {row[0]: {"total_rmb": row[1], "total_usd": row[2], "count": row[3]} for row in rows}
+
+def get_all_time_totals(chat_id):
+    """所有账期合计，格式同 get_ledger_totals"""
+    with get_conn() as conn:
+        rows = conn.execute(
+            '''SELECT type, SUM(total_rmb), SUM(total_usd), SUM(count) FROM ledger_totals
+            WHERE chat_id = ? GROUP BY type''',
+            (chat_id,)
+        ).fetchall()
+    return {row[0]: {"total_rmb": row[1], "total_usd": row[2], "count": row[3]} for row in rows}
+
+def get_daily_summaries(chat_id, start_ts=None, end_ts=None, name=None):
+    """
+    每日汇总（按账期倒序），筛选条件与 get_record_page 相同（时间戳范围、显示名）；
+    不带筛选条件时直接读汇总表，不扫描原始记录
+    返回格式: [{'day': 'YYYY-MM-DD', 'income_rmb': ..., 'income_usd': ..., 'income_count': ...,
+                'payout_rmb': ..., 'payout_usd': ..., 'payout_count': ...}, ...]
+    """
+    with get_conn() as conn:
+        if start_ts is None and end_ts is None and not name:
+            rows = conn.execute(
+                "SELECT accounting_day, type, total_rmb, total_usd, count FROM ledger_totals WHERE chat_id = ? ORDER BY accounting_day DESC",
+                (chat_id,)
+            ).fetchall()
+        else:
+            where, params = _record_filter(chat_id, None, start_ts, end_ts, name)
+            rows = conn.execute(
+                f'''SELECT accounting_day, type, SUM(amount_rmb), SUM(amount_usd), COUNT(*)
+                FROM accounting_records WHERE {where}
+                GROUP BY accounting_day, type ORDER BY accounting_day DESC''',
+                params
+            ).fetchall()
+
+    days = {}
+    for day, r_type, total_rmb, total_usd, count in rows:
+        summary = days.setdefault(day, {
+            "day": day,
+            "income_rmb": 0, "income_usd": 0, "income_count": 0,
+            "payout_rmb": 0, "payout_usd": 0, "payout_count": 0,
+        })
+        prefix = "income" if r_type == "入款" else "payout"
+        summary[f"{prefix}_rmb"] += total_rmb
+        summary[f"{prefix}_usd"] += total_usd
+        summary[f"{prefix}_count"] += count
+    return list(days.values())
+
+def get_bill_snapshot(chat_id, day, user_limit=3, income_limit=5, payout_limit=3):
+    """
+    账单所需的全部数据，一次取连接完成：汇总表读总额与笔数，索引按时间戳倒序只取前 N 条
+    时间由时间戳直接换算为北京时间 HH:MM:SS，渲染时无需解析
+    返回格式: {'totals': {...}, 'users': [(display_name, total_rmb, total_usd), ...],
+              '入款': [(time, amount_rmb, amount_usd, display_name, rate), ...], '下发': [...]}
+    """
+    latest_sql = '''SELECT strftime('%H:%M:%S', created_ts, 'unixepoch', '+8 hours'),
+            amount_rmb, amount_usd, display_name, rate FROM accounting_records
+        WHERE chat_id = ? AND accounting_day = ? AND type = ?
+        ORDER BY created_ts DESC, id DESC LIMIT ?'''
+    with get_conn() as conn:
+        totals = {}
+        for r_type, total_rmb, total_usd, count in conn.execute(
+            "SELECT type, total_rmb, total_usd, count FROM ledger_totals WHERE chat_id = ? AND accounting_day = ?",
+            (chat_id, day)
+        ):
+            totals[r_type] = {"total_rmb": total_rmb, "total_usd": total_usd, "count": count}
+        users = conn.execute(
+            '''SELECT display_name, total_rmb, total_usd FROM ledger_user_totals
+            WHERE chat_id = ? AND accounting_day = ? AND type = '入款'
+            ORDER BY last_record_id DESC LIMIT ?''',
+            (chat_id, day, user_limit)
+        ).fetchall()
+        income = conn.execute(latest_sql, (chat_id, day, "入款", income_limit)).fetchall()
+        payout = conn.execute(latest_sql, (chat_id, day, "下发", payout_limit)).fetchall()
+    return {"totals": totals, "users": users, "入款": income, "下发": payout}
+
+# ---------- 完整账单筛选 ----------
+def _record_filter(chat_id, r_type=None, start_ts=None, end_ts=None, name=None):
+    """完整账单的筛选条件：时间戳范围 [start_ts, end_ts)、显示名模糊匹配"""
+    where, params = ["chat_id = ?"], [chat_id]
+    if r_type is not None:
+        where.append("type = ?")
+        params.append(r_type)
+    if start_ts is not None:
+        where.append("created_ts >= ?")
+        params.append(start_ts)
+    if end_ts is not None:
+        where.append("created_ts < ?")
+        params.append(end_ts)
+    if name:
+        where.append("display_name LIKE ? ESCAPE '\\'")
+        escaped = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params.append(f"%{escaped}%")
+    return " AND ".join(where), params
+
+def get_record_page(chat_id, r_type, start_ts=None, end_ts=None, name=None, cursor=None, limit=100):
+    """
+    按时间倒序取一页指定类型记录，cursor 为上一页最后一条的 (created_ts, id)
+    返回 (rows, next_cursor)，rows 格式: [(display_name, amount_rmb, amount_usd, rate, operator, time), ...]
+    """
+    where, params = _record_filter(chat_id, r_type, start_ts, end_ts, name)
+    if cursor is not None:
+        where += " AND (created_ts, id) < (?, ?)"
+        params.extend(cursor)
+    with get_conn() as conn:
+        rows = conn.execute(
+            f'''SELECT display_name, amount_rmb, amount_usd, rate, operator,
+                strftime('%Y-%m-%d %H:%M:%S', created_ts, 'unixepoch', '+8 hours'), created_ts, id
+            FROM accounting_records WHERE {where}
+            ORDER BY created_ts DESC, id DESC LIMIT ?''',
+            params + [limit + 1]
+        ).fetchall()
+    next_cursor = (rows[limit - 1][6], rows[limit - 1][7]) if len(rows) > limit else None
+    return [row[:6] for row in rows[:limit]], next_cursor
+
+def get_record_totals(chat_id, start_ts=None, end_ts=None, name=None):
+    """筛选范围内按类型的合计，格式同 get_ledger_totals；不带筛选条件时直接读汇总表"""
+    if start_ts is None and end_ts is None and not name:
+        return get_all_time_totals(chat_id)
+    where, params = _record_filter(chat_id, None, start_ts, end_ts, name)
+    with get_conn() as conn:
+        rows = conn.execute(
+            f'''SELECT type, SUM(amount_rmb), SUM(amount_usd), COUNT(*)
+            FROM accounting_records WHERE {where} GROUP BY type''',
+            params
+        ).fetchall()
+    return {row[0]: {"total_rmb": row[1], "total_usd": row[2], "count": row[3]} for row in rows}
+
+def iter_record_summaries(chat_id, r_type, start_ts=None, end_ts=None, name=None):
+    """
+    按 (显示名, 操作者) 分组汇总指定类型记录（可带与分页相同的筛选条件），逐行产出，供流式渲染
+    产出格式: {'user': ..., 'operator': ..., 'total_rmb': ..., 'total_usd': ..., 'count': ...}
+    """
+    where, params = _record_filter(chat_id, r_type, start_ts, end_ts, name)
+    with get_conn() as conn:
+        for row in conn.execute(
+            f'''SELECT display_name, operator, SUM(amount_rmb), SUM(amount_usd), COUNT(*)
+            FROM accounting_records WHERE {where}
+            GROUP BY display_name, operator ORDER BY MIN(id)''',
+            params
+        ):
+            yield {"user": row[0], "operator": row[1], "total_rmb": row[2], "total_usd": row[3], "count": row[4]}
+
+def get_record_summaries(chat_id, r_type, start_ts=None, end_ts=None, name=None):
+    return list(iter_record_summaries(chat_id, r_type, start_ts, end_ts, name))
+
+def iter_export_records(chat_id, start_ts=None, end_ts=None, name=None, batch_size=1000):
+    """
+    导出用：按时间正序逐批读取记录（同一个游标 fetchmany，内存占用与记录总数无关）
+    产出格式: (type, display_name, user, amount_rmb, amount_usd, rate, operator, 'YYYY-MM-DD HH:MM:SS', accounting_day)
+    """
+    where, params = _record_filter(chat_id, None, start_ts, end_ts, name)
+    with get_conn() as conn:
+        cursor = conn.execute(
+            f'''SELECT type, display_name, user, amount_rmb, amount_usd, rate, operator,
+                strftime('%Y-%m-%d %H:%M:%S', created_ts, 'unixepoch', '+8 hours'), accounting_day
+            FROM accounting_records WHERE {where} ORDER BY created_ts, id''',
+            params
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
 
 # 操作员管理函数
 def add_operator(chat_id, username):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "INSERT OR IGNORE INTO operators (chat_id, username) VALUES (?, ?)",
-        (chat_id, username)
-    )
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO operators (chat_id, username) VALUES (?, ?)",
+            (chat_id, username)
+        )
 
 def remove_operator(chat_id, username):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "DELETE FROM operators WHERE chat_id = ? AND username = ?",
-        (chat_id, username)
-    )
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute(
+            "DELETE FROM operators WHERE chat_id = ? AND username = ?",
+            (chat_id, username)
+        )
 
 def get_operators(chat_id):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT username FROM operators WHERE chat_id = ?",
-        (chat_id,)
-    )
-    rows = cursor.fetchall()
-    conn.close()
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT username FROM operators WHERE chat_id = ?",
+            (chat_id,)
+        ).fetchall()
     return [row[0] for row in rows]
 
 def load_operators():
@@ -211,38 +657,26 @@ def load_operators():
 
 # 钱包地址管理函数
 def get_wallet_addresses_db(chat_id):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT address, remark FROM wallet_addresses WHERE chat_id = ?",
-        (chat_id,)
-    )
-    rows = cursor.fetchall()
-    conn.close()
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT address, remark FROM wallet_addresses WHERE chat_id = ?",
+            (chat_id,)
+        ).fetchall()
     return [{"address": row[0], "remark": row[1]} for row in rows]
 
 def add_wallet_address_db(chat_id, address, remark):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "INSERT OR REPLACE INTO wallet_addresses (chat_id, address, remark) VALUES (?, ?, ?)",
-        (chat_id, address, remark)
-    )
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO wallet_addresses (chat_id, address, remark) VALUES (?, ?, ?)",
+            (chat_id, address, remark)
+        )
 
 def delete_wallet_address_db(chat_id, address):
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "DELETE FROM wallet_addresses WHERE chat_id = ? AND address = ?",
-        (chat_id, address)
-    )
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute(
+            "DELETE FROM wallet_addresses WHERE chat_id = ? AND address = ?",
+            (chat_id, address)
+        )
     return True
 
 # 获取所有钱包地址（用于 TRON 监听器）
@@ -251,15 +685,11 @@ def get_all_wallet_addresses():
     获取所有群组的所有钱包地址
     返回格式: [{'chat_id': 123456, 'address': 'T...', 'remark': '备注'}, ...]
     """
-    conn = sqlite3.connect("bot.db")
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT chat_id, address, remark FROM wallet_addresses"
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT chat_id, address, remark FROM wallet_addresses"
+        ).fetchall()
+
     result = []
     for row in rows:
         result.append({
@@ -267,5 +697,69 @@ def get_all_wallet_addresses():
             'address': row[1],
             'remark': row[2] or ''
         })
-    
+
     return result
+
+# ---------- TRON 监听器状态 ----------
+def load_tron_state():
+    """
+    读取每个地址的游标，以及游标时间戳（含）之后的已推送交易（用于去重）
+    返回格式: ({address: {'timestamp': ..., 'tx_id': ...}}, {address: {tx_id, ...}})
+    """
+    with get_conn() as conn:
+        cursor_rows = conn.execute(
+            "SELECT address, last_timestamp, last_tx_id FROM tron_cursors"
+        ).fetchall()
+        seen_rows = conn.execute(
+            '''SELECT s.address, s.tx_id FROM tron_cursors c
+            JOIN tron_seen_txs s ON s.address = c.address AND s.block_timestamp >= c.last_timestamp'''
+        ).fetchall()
+
+    cursors = {row[0]: {"timestamp": row[1], "tx_id": row[2]} for row in cursor_rows}
+    seen = {}
+    for address, tx_id in seen_rows:
+        seen.setdefault(address, set()).add(tx_id)
+    return cursors, seen
+
+def save_tron_state(seen_txs, cursors):
+    """
+    批量写入已推送交易与游标（同一事务）
+    seen_txs: [(address, tx_id, block_timestamp), ...]
+    cursors: {address: {'timestamp': ..., 'tx_id': ...}}
+    """
+    now = int(time.time())
+    with get_conn() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO tron_seen_txs (address, tx_id, block_timestamp, seen_at) VALUES (?, ?, ?, ?)",
+            [(address, tx_id, ts, now) for address, tx_id, ts in seen_txs]
+        )
+        conn.executemany(
+            '''INSERT INTO tron_cursors (address, last_timestamp, last_tx_id) VALUES (?, ?, ?)
+            ON CONFLICT (address) DO UPDATE SET
+                last_timestamp = MAX(last_timestamp, excluded.last_timestamp),
+                last_tx_id = CASE WHEN excluded.last_timestamp >= last_timestamp THEN excluded.last_tx_id ELSE last_tx_id END''',
+            [(address, c["timestamp"], c["tx_id"]) for address, c in cursors.items()]
+        )
+
+def filter_seen_txs(address, tx_ids):
+    """返回 tx_ids 中已推送过的交易 ID 集合"""
+    if not tx_ids:
+        return set()
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"SELECT tx_id FROM tron_seen_txs WHERE address = ? AND tx_id IN ({','.join('?' * len(tx_ids))})",
+            (address, *tx_ids)
+        ).fetchall()
+    return {row[0] for row in rows}
+
+def prune_tron_seen(retention_seconds):
+    """删除超过保留期的已推送交易，游标时间戳上的交易仍需去重，予以保留"""
+    cutoff = int(time.time()) - retention_seconds
+    with get_conn() as conn:
+        cursor = conn.execute(
+            '''DELETE FROM tron_seen_txs WHERE seen_at < ? AND block_timestamp < COALESCE(
+                (SELECT last_timestamp FROM tron_cursors c WHERE c.address = tron_seen_txs.address), 0
+            )''',
+            (cutoff,)
+        )
+        return cursor.rowcount
@@ -0,0 +1,64 @@
+"""
+记账记录导出（CSV / XLSX）
+逐行读取、逐行写出，内存占用与记录数无关；在独立线程中调用，不占用 bot 事件循环和数据库线程
+"""
+import csv
+import io
+import os
+import tempfile
+
+from db import iter_export_records
+
+EXPORT_HEADER = ["类型", "操作人", "用户名", "金额(RMB)", "金额(USD)", "汇率", "操作者", "时间", "账期"]
+EXPORT_FORMATS = ("xlsx", "csv")
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")  # Excel 会当作公式解析的开头字符
+
+def escape_row(row):
+    """文本单元格以公式字符开头时加 ' 前缀，防止群成员昵称被 Excel 当作公式执行"""
+    return [f"'{value}" if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value for value in row]
+
+def iter_csv(chat_id, **filters):
+    """逐行产出 CSV 文本（带 BOM，Excel 可直接打开中文），供网页流式下载"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_HEADER)
+    for count, row in enumerate(iter_export_records(chat_id, **filters), start=1):
+        writer.writerow(escape_row(row))
+        if count % 1000 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def write_csv(chat_id, path, **filters):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in iter_csv(chat_id, **filters):
+            f.write(chunk)
+
+def write_xlsx(chat_id, path, **filters):
+    """openpyxl 只写模式：行写出后即释放，不在内存中保留整张表"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("记账记录")
+    sheet.append(EXPORT_HEADER)
+    for row in iter_export_records(chat_id, **filters):
+        sheet.append(escape_row(row))
+    workbook.save(path)
+
+def export_records(chat_id, fmt="xlsx", **filters):
+    """导出到临时文件并返回路径，调用方负责发送后删除"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    fd, path = tempfile.mkstemp(prefix=f"bill_{chat_id}_", suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        if fmt == "csv":
+            write_csv(chat_id, path, **filters)
+        else:
+            write_xlsx(chat_id, path, **filters)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
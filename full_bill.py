@@ -1,18 +1,27 @@
-from flask import Flask, render_template
-from db import get_records, get_group_config
-from datetime import datetime
+from flask import Flask, request, send_file, stream_template, url_for
+from db import get_record_page, get_record_totals, get_daily_summaries, iter_record_summaries, get_ledger_stamp
+from page_cache import PageCache
+from export import EXPORT_FORMATS, export_records, iter_csv
+from datetime import datetime, timezone
+import gzip
+import hashlib
+import zlib
 import pytz
 import os
+import config
+
+try:
+    import brotli  # 可选：安装后对支持的浏览器使用 br 压缩
+except ImportError:
+    brotli = None
 
 app = Flask(__name__, template_folder=os.path.join(os.path.dirname(__file__), "templates"))
 
-def format_time(dt):
-    """格式化时间：显示 年-月-日 时:分:秒"""
-    if isinstance(dt, str):
-        return dt
-    elif isinstance(dt, datetime):
-        return dt.strftime("%Y-%m-%d %H:%M:%S")
-    return str(dt)
+BEIJING_TZ = pytz.timezone('Asia/Shanghai')
+PAGE_SIZE = 100  # 入款、下发表格每页条数
+STREAM_CHUNK_BYTES = 16 * 1024  # 流式发送时每次压缩、发送的最小字节数
+
+page_cache = PageCache(config.BILL_PAGE_CACHE_BYTES)
 
 def format_number(num):
     """整数显示整数，小数最多两位"""
@@ -27,6 +36,132 @@ def format_number(num):
 def index():
     return "Flask server is running!"
 
+def parse_day(value):
+    """'YYYY-MM-DD'（北京时间）转为当天 0 点的时间戳，空值返回 None"""
+    if not value:
+        return None
+    return int(BEIJING_TZ.localize(datetime.strptime(value, "%Y-%m-%d")).timestamp())
+
+def parse_cursor(value):
+    """翻页游标 '<时间戳>_<id>'"""
+    if not value:
+        return None
+    ts, record_id = value.split("_")
+    return int(ts), int(record_id)
+
+def parse_filters():
+    """查询参数中的开始/结束日期（含当天）与名字，转换为数据库筛选条件；日期无效时抛出 ValueError"""
+    start_ts = parse_day(request.args.get("start", ""))
+    end_ts = parse_day(request.args.get("end", ""))
+    if end_ts is not None:
+        end_ts += 86400
+    return {"start_ts": start_ts, "end_ts": end_ts, "name": request.args.get("name", "").strip() or None}
+
+# ---------- 压缩 ----------
+class _GzipStream:
+    def __init__(self):
+        self._z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 输出 gzip 格式
+
+    def process(self, data):
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data):
+        return self._z.compress(data) + self._z.flush()
+
+class _BrotliStream:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=5)
+
+    def process(self, data):
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data):
+        return self._c.process(data) + self._c.finish()
+
+class _IdentityStream:
+    def process(self, data):
+        return data
+
+    finish = process
+
+STREAM_ENCODERS = {"gzip": _GzipStream, "identity": _IdentityStream}
+if brotli is not None:
+    STREAM_ENCODERS["br"] = _BrotliStream
+
+def compress(data, encoding):
+    if encoding == "gzip":
+        return gzip.compress(data, 6)
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return data
+
+def choose_encoding():
+    return request.accept_encodings.best_match(["br", "gzip"] if brotli is not None else ["gzip"]) or "identity"
+
+class _CacheBuffer:
+    """收集待写入页面缓存的分段，累计超过上限后丢弃已收集的内容并停止收集"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.parts, self.size = [], 0
+
+    def append(self, data):
+        if self.parts is None:
+            return
+        self.size += len(data)
+        if self.size > self.limit:
+            self.parts = None
+        else:
+            self.parts.append(data)
+
+    def value(self):
+        return None if self.parts is None else b"".join(self.parts)
+
+def encode_stream(chunks, encoding, cache_key):
+    """
+    边渲染边压缩发送：第一段（页头与汇总）立即发出，之后攒够 STREAM_CHUNK_BYTES 再压缩一次，避免碎片；
+    不压缩时逐段直接发送。完整发送后把原文与压缩结果写入页面缓存，
+    超过缓存单条上限的页面不缓存，也不在发送过程中保留副本
+    """
+    encoder = STREAM_ENCODERS[encoding]()
+    batch_size = STREAM_CHUNK_BYTES if encoding != "identity" else 0
+    threshold = 0  # 第一段不等待
+    raw = _CacheBuffer(page_cache.max_entry_bytes)
+    encoded = _CacheBuffer(page_cache.max_entry_bytes)
+    pending, pending_size = [], 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        raw.append(data)
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= threshold:
+            out = encoder.process(b"".join(pending))
+            pending, pending_size, threshold = [], 0, batch_size
+            if encoding != "identity":
+                encoded.append(out)
+            yield out
+    out = encoder.finish(b"".join(pending))
+    if out:
+        yield out
+
+    page = raw.value()
+    if page is not None:
+        page_cache.put(cache_key, page)
+    if encoding != "identity":
+        encoded.append(out)
+        page = encoded.value()
+        if page is not None:
+            page_cache.put(cache_key, page, encoding)
+
+# ---------- 完整账单 ----------
+def not_modified(etag, last_modified):
+    """条件请求：If-None-Match 优先（弱比较），其次 If-Modified-Since"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
 @app.route("/bill/<chat_id>")
 def bill(chat_id):
     try:
@@ -34,70 +169,125 @@ def bill(chat_id):
     except ValueError:
         return "Invalid chat_id", 400
 
-    records = get_records(chat_id)
-    group_conf = get_group_config(chat_id)
-    rate_fixed = group_conf.get('rate', 1)
-    
-    # 格式化记录
-    formatted_records = []
-    for r in records:
-        r_type, user, display_name, amount_rmb, amount_usd, rate, operator, time_str = r
-        formatted_records.append({
-            "type": r_type,
-            "user": display_name,
-            "rmb": float(amount_rmb),
-            "usd": float(amount_usd),
-            "rate": float(rate),
-            "operator": operator,
-            "time": format_time(time_str)
-        })
-
-    # 入款汇总 / 下发汇总
-    income_summary_dict = {}
-    payout_summary_dict = {}
-
-    total_income_rmb = 0
-    total_income_usd = 0
-    total_payout_rmb = 0
-    total_payout_usd = 0
-
-    for r in formatted_records:
-        if r['type'] == '入款':
-            total_income_rmb += r['rmb']
-            total_income_usd += r['usd']
-            key = (r['user'], r['operator'])
-            if key not in income_summary_dict:
-                income_summary_dict[key] = {"total_rmb": 0, "remaining_rmb": 0, "count": 0, "user": r['user'], "operator": r['operator']}
-            income_summary_dict[key]["total_rmb"] += r['rmb']
-            income_summary_dict[key]["remaining_rmb"] += r['usd']
-            income_summary_dict[key]["count"] += 1
-        elif r['type'] == '下发':
-            total_payout_rmb += r['rmb']
-            total_payout_usd += r['usd']
-            key = (r['user'], r['operator'])
-            if key not in payout_summary_dict:
-                payout_summary_dict[key] = {"total_rmb": 0, "remaining_rmb": 0, "count": 0, "user": r['user'], "operator": r['operator']}
-            payout_summary_dict[key]["total_rmb"] += r['rmb']
-            payout_summary_dict[key]["remaining_rmb"] += r['usd']
-            payout_summary_dict[key]["count"] += 1
-
-    # 转换成列表
-    income_summary = list(income_summary_dict.values())
-    payout_summary = list(payout_summary_dict.values())
-
-    return render_template(
+    # 页面内容只取决于账本版本号和查询参数：版本号未变时返回 304 或直接使用缓存的页面
+    version, updated_at = get_ledger_stamp(chat_id)
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    etag = f"{chat_id}-{version}-{hashlib.md5(query.encode('utf-8')).hexdigest()[:16]}"
+    last_modified = datetime.fromtimestamp(updated_at, timezone.utc) if updated_at else None
+    cache_key = (chat_id, version, query)
+
+    if not_modified(etag, last_modified):
+        response = app.response_class(status=304)
+    else:
+        encoding = choose_encoding()
+        body = page_cache.get(cache_key, encoding)
+        if body is None and encoding != "identity":
+            raw = page_cache.get(cache_key)
+            if raw is not None:
+                body = compress(raw, encoding)
+                page_cache.put(cache_key, body, encoding)
+        if body is None:
+            try:
+                chunks = render_bill_page(chat_id)
+            except ValueError:
+                return "Invalid query", 400
+            body = encode_stream(chunks, encoding, cache_key)
+        response = app.response_class(body, mimetype="text/html")
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = "no-cache"  # 浏览器每次都带条件请求回来验证
+    response.vary.add("Accept-Encoding")
+    return response
+
+def render_bill_page(chat_id):
+    """按查询参数渲染完整账单，返回流式渲染的字符串迭代器；查询参数无效时抛出 ValueError"""
+    # 查询条件：开始/结束日期（含当天）、名字、两张表各自的翻页游标
+    start_date = request.args.get("start", "")
+    end_date = request.args.get("end", "")
+    name = request.args.get("name", "").strip()
+    filters = parse_filters()
+    income_cursor = parse_cursor(request.args.get("income_cursor"))
+    payout_cursor = parse_cursor(request.args.get("payout_cursor"))
+
+    # 只取当前一页明细，其余统计都在 SQL 中完成
+    income_rows, income_next = get_record_page(chat_id, "入款", cursor=income_cursor, limit=PAGE_SIZE, **filters)
+    payout_rows, payout_next = get_record_page(chat_id, "下发", cursor=payout_cursor, limit=PAGE_SIZE, **filters)
+
+    def format_rows(rows):
+        for display_name, amount_rmb, amount_usd, rate, operator, time_str in rows:
+            yield {"user": display_name, "rmb": float(amount_rmb), "usd": float(amount_usd),
+                   "rate": float(rate), "operator": operator, "time": time_str}
+
+    def page_url(**cursors):
+        args = {k: v for k, v in request.args.items() if v and not k.endswith("_cursor")}
+        args.update({k: f"{v[0]}_{v[1]}" for k, v in cursors.items() if v})
+        return url_for("bill", chat_id=chat_id, **args)
+
+    # 入款汇总 / 下发汇总由 SQL 分组得出，渲染到对应位置时才逐行读取
+    income_summary = iter_record_summaries(chat_id, "入款", **filters)
+    payout_summary = iter_record_summaries(chat_id, "下发", **filters)
+
+    totals = get_record_totals(chat_id, **filters)
+    daily_summary = get_daily_summaries(chat_id, **filters)
+    income_totals = totals.get("入款", {})
+    payout_totals = totals.get("下发", {})
+    total_income_rmb = income_totals.get("total_rmb", 0)
+    total_income_usd = income_totals.get("total_usd", 0)
+    total_payout_rmb = payout_totals.get("total_rmb", 0)
+    total_payout_usd = payout_totals.get("total_usd", 0)
+
+    # 流式渲染：页头与表格边生成边发送
+    return stream_template(
         "bill.html",
-        records=formatted_records,
+        income_records=format_rows(income_rows),
+        payout_records=format_rows(payout_rows),
+        income_count=income_totals.get("count", 0),
+        payout_count=payout_totals.get("count", 0),
+        income_next_url=page_url(income_cursor=income_next, payout_cursor=payout_cursor) if income_next else None,
+        payout_next_url=page_url(income_cursor=income_cursor, payout_cursor=payout_next) if payout_next else None,
+        first_page_url=page_url() if income_cursor or payout_cursor else None,
+        start_date=start_date,
+        end_date=end_date,
+        name=name,
         income_summary=income_summary,
         payout_summary=payout_summary,
+        daily_summary=daily_summary,
         total_income_rmb=format_number(total_income_rmb),
         total_income_usd=format_number(total_income_usd),
         total_payout_rmb=format_number(total_payout_rmb),
         total_payout_usd=format_number(total_payout_usd)
     )
 
+@app.route("/bill/<chat_id>/export")
+def export_bill(chat_id):
+    """下载记录：format=csv 边查边发送；format=xlsx 先写入临时文件再发送（筛选参数同完整账单）"""
+    try:
+        chat_id = int(chat_id)
+        filters = parse_filters()
+    except ValueError:
+        return "Invalid query", 400
+    fmt = request.args.get("format", "xlsx")
+    if fmt not in EXPORT_FORMATS:
+        return "Invalid format", 400
+
+    filename = f"bill_{chat_id}.{fmt}"
+    if fmt == "csv":
+        response = app.response_class(iter_csv(chat_id, **filters), mimetype="text/csv")
+        response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+        return response
+
+    path = export_records(chat_id, fmt, **filters)
+    response = send_file(path, as_attachment=True, download_name=filename)
+    response.call_on_close(lambda: os.remove(path))
+    return response
+
 def run_flask():
-    app.run(host="0.0.0.0", port=8000, debug=False)
+    """开发服务器（BILL_SERVER_MODE=thread 时由 bot 进程在后台线程启动）；生产环境用 gunicorn 运行 wsgi:app"""
+    app.run(host=config.BILL_HOST, port=config.BILL_PORT, debug=False, threaded=True)
 
 if __name__ == "__main__":
     run_flask()
@@ -0,0 +1,25 @@
+"""
+gunicorn 配置：多进程 + 每进程多线程服务完整账单网页
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+工作进程数与线程数分别由 BILL_WORKERS、BILL_THREADS 配置，监听地址由 BILL_HOST、BILL_PORT 配置
+"""
+import config
+from db import init_db, close_db
+
+bind = f"{config.BILL_HOST}:{config.BILL_PORT}"
+workers = config.BILL_WORKERS
+threads = config.BILL_THREADS
+worker_class = "gthread"
+timeout = 30
+keepalive = 5
+accesslog = "-"
+
+# 不预加载应用：每个工作进程各自建立 SQLite 连接池，连接不会跨 fork 共享
+preload_app = False
+
+def on_starting(server):
+    """主进程启动时执行一次迁移，避免多个工作进程同时迁移；随后关闭主进程的连接"""
+    init_db()
+    close_db()
@@ -1,3 +1,4 @@
+import asyncio
 import re
 from datetime import datetime
 import pytz
@@ -6,12 +7,16 @@ from telegram.ext import ContextTypes
 from db import (
     add_record, get_group_config, set_group_rate, set_group_fee,
     delete_records, remove_record_by_msgid, add_operator, remove_operator,
-    get_operators, load_operators, set_group_daily_reset
+    get_operators, load_operators, set_group_daily_reset, set_group_live_bill
 )
 from report import generate_bill
+from async_db import run_db
+from calculator import CalcError, evaluate
+from handlers.router import CommandRouter
 from db import get_wallet_addresses_db, add_wallet_address_db, delete_wallet_address_db
 
 # ---------- 正则表达式 ----------
+start_pattern = re.compile(r'^开始$')
 # 地址
 add_addr_pattern = re.compile(r'^设置地址\s+([T1UQ][A-Za-z0-9]{33,48})\s*(.*)$')
 del_addr_pattern = re.compile(r'^删除地址\s+([T1UQ][A-Za-z0-9]{33,48})$')
@@ -31,6 +36,9 @@ del_bill_pattern = re.compile(r'^删除账单$')
 tron_pattern = re.compile(r"^T[1-9A-HJ-NP-Za-km-z]{33}$")
 ton_pattern = re.compile(r"^[UQ][A-Za-z0-9]{47,48}$")
 set_reset_pattern = re.compile(r'^设置日切[：: ]?\s*(\d{1,2})$')
+live_bill_pattern = re.compile(r'^(开启|关闭)实时账单$')
+# 以「撤销」开头但符合快捷入款格式的（如「撤销+100」）按快捷入款处理，与旧版先匹配快捷入款的顺序一致
+cancel_route_pattern = re.compile(r'^撤销(?![\u4e00-\u9fa5\w]*\+\d+(?:\.\d+)?(?:/\d+(?:\.\d+)?)?$)')
 
 # ---------- 内存缓存 ----------
 group_operators = {}  # 缓存操作人
@@ -63,18 +71,40 @@ def is_operator(chat_id: int, username: str) -> bool:
 def is_authorized(user_id: int, username: str, chat_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
     return is_super_admin(user_id, context) or is_operator(chat_id, username)
 
+# ---------- 发送账单 ----------
+async def send_bill(context: ContextTypes.DEFAULT_TYPE, chat_id: int, force_new: bool = False):
+    """
+    刷新账单：短时间内连续记账只渲染、发送一次；
+    开启实时账单的群原地编辑上一条账单，force_new 时总是发新消息
+    """
+    live_bill = context.bot_data.get("live_bill")
+    if live_bill:
+        live_bill.schedule(chat_id, force_new=force_new)
+        return
+    bill_text, bill_markup = await run_db(generate_bill, chat_id)
+    await context.bot.send_message(chat_id=chat_id, text=bill_text, reply_markup=bill_markup)
+
 # ---------- 初始化操作人 ----------
 def init_operators():
     load_operators()
 
+# ---------- 命令路由 ----------
+router = CommandRouter()
+CALC_FIRST_CHARS = "0123456789.()"
+
+def _sender(update: Update):
+    user = update.effective_user
+    return update.effective_chat.id, user, user.username or user.full_name
+
+def _is_activated(chat_id: int) -> bool:
+    return REQUIRED_COMMANDS.issubset(group_activation_status.get(chat_id, set()))
+
 # ---------- 主入口 ----------
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message:
         return False
 
     chat_id = update.effective_chat.id
-    user = update.effective_user
-    username = user.username or user.full_name
     text = update.message.text.strip()
 
     # 禁止私聊
@@ -82,253 +112,294 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ 此机器人仅支持群组使用")
         return False
 
-    # ---------- 激活模块 ----------
-    if text == "开始":
-        group_activation_status.setdefault(chat_id, set()).add("开始")
-        await update.message.reply_text("✅ 已执行开始命令")
+    # 普通聊天在这里直接返回，不做正则匹配、不查数据库
+    resolved = router.resolve(text)
+    if resolved is None:
         return False
+    handler, m = resolved
 
     # 初始化群组操作人缓存
     if chat_id not in group_operators:
-        operators = get_operators(chat_id)
+        operators = await run_db(get_operators, chat_id)
         group_operators[chat_id] = set(operators)
 
-    # ---------- 地址验证 ----------
-    if tron_pattern.match(text) or ton_pattern.match(text):
-        addr = text
-        rec = address_records.setdefault(addr, {"count": 0, "last_user": None})
-        rec["count"] += 1
-        last_user = rec["last_user"]
-        rec["last_user"] = f"@{username}"
-        reply = f"地址：{addr}\n验证次数：{rec['count']}"
-        if last_user:
-            reply += f"\n上次发送：{last_user}\n本次发送：@{username}"
-        else:
-            reply += f"\n首次发送：@{username}"
-        await update.message.reply_text(reply)
+    return await handler(update, context, m)
+
+# ---------- 激活模块 ----------
+@router.route(start_pattern, prefix="开始")
+async def handle_start(update, context, m):
+    chat_id, _, _ = _sender(update)
+    group_activation_status.setdefault(chat_id, set()).add("开始")
+    await update.message.reply_text("✅ 已执行开始命令")
+    return False
+
+# ---------- 地址验证 ----------
+@router.route(tron_pattern, first_chars="T")
+@router.route(ton_pattern, first_chars="UQ")
+async def handle_address_check(update, context, m):
+    _, _, username = _sender(update)
+    addr = m.group(0)
+    rec = address_records.setdefault(addr, {"count": 0, "last_user": None})
+    rec["count"] += 1
+    last_user = rec["last_user"]
+    rec["last_user"] = f"@{username}"
+    reply = f"地址：{addr}\n验证次数：{rec['count']}"
+    if last_user:
+        reply += f"\n上次发送：{last_user}\n本次发送：@{username}"
+    else:
+        reply += f"\n首次发送：@{username}"
+    await update.message.reply_text(reply)
+    return False
+
+# ---------- 显示账单 ----------
+@router.route(bill_pattern, prefix="+0")
+async def handle_show_bill(update, context, m):
+    await send_bill(context, update.effective_chat.id, force_new=True)
+    return False
+
+# ---------- 计算器 ----------
+@router.route(calc_pattern, first_chars=CALC_FIRST_CHARS)
+async def handle_calc(update, context, m):
+    text = m.group(0)
+    if text.startswith("+") or text.isdigit():
+        return False
+    # 语法树求值有长度、数值和指数上限，并在线程中执行，不会卡住事件循环
+    try:
+        result = await asyncio.to_thread(evaluate, text)
+    except CalcError:
+        return False
+    await update.message.reply_text(f"{format_amount(result)}")
+    return False
+
+# ---------- 快捷入款 ----------
+@router.route(quick_pattern, contains="+")
+async def handle_quick_income(update, context, m):
+    chat_id, user, username = _sender(update)
+    if not _is_activated(chat_id):
+        await update.message.reply_text("⚠️ 记账模块未激活，请先执行：开始")
+        return False
+
+    if not is_authorized(user.id, username, chat_id, context):
+        await update.message.reply_text("⚠️ 只有超级管理员或操作人可以记账")
         return False
 
-    # ---------- 显示账单 ----------
-    if bill_pattern.match(text):
-        bill_text, bill_markup = generate_bill(chat_id)
-        await context.bot.send_message(chat_id=chat_id, text=bill_text, reply_markup=bill_markup)
+    remark = m.group(1)
+    amount_rmb = float(m.group(2))
+    group_conf = await run_db(get_group_config, chat_id)
+    rate = float(m.group(3)) if m.group(3) else group_conf["rate"]
+    amount_usd = amount_rmb / rate
+    display_name = remark.strip() if remark and remark.strip() else user.full_name or username
+
+    record = {
+        "type": "入款",
+        "user": display_name,
+        "display_name": display_name,
+        "amount_rmb": amount_rmb,
+        "amount_usd": amount_usd,
+        "rate": rate,
+        "operator": username,
+        "time": get_beijing_time().strftime("%H:%M:%S"),
+        "msg_id": update.message.message_id
+    }
+
+    try:
+        await run_db(add_record, chat_id, record)
+    except Exception as e:
+        await update.message.reply_text(f"⚠️ 记录失败: {e}")
         return False
 
-    # ---------- 计算器 ----------
-    if calc_pattern.match(text):
-        if text.startswith("+") or text.isdigit():
-            return False
-        try:
-            result = eval(text, {"__builtins__": None}, {})
-            if isinstance(result, (int, float)):
-                await update.message.reply_text(f"{format_amount(result)}")
-                return False
-        except Exception:
-            return False
-
-    # ---------- 快捷入款 ----------
-    m = quick_pattern.match(text)
-    if m:
-        activated = group_activation_status.get(chat_id, set())
-        if not REQUIRED_COMMANDS.issubset(activated):
-            await update.message.reply_text("⚠️ 记账模块未激活，请先执行：开始")
-            return False
-
-        if not is_authorized(user.id, username, chat_id, context):
-            await update.message.reply_text("⚠️ 只有超级管理员或操作人可以记账")
-            return False
-
-        remark = m.group(1)
-        amount_rmb = float(m.group(2))
-        group_conf = get_group_config(chat_id)
-        rate = float(m.group(3)) if m.group(3) else group_conf["rate"]
-        amount_usd = amount_rmb / rate
-        display_name = remark.strip() if remark and remark.strip() else user.full_name or username
-
-        record = {
-            "type": "入款",
-            "user": display_name,
-            "display_name": display_name,
-            "amount_rmb": amount_rmb,
-            "amount_usd": amount_usd,
-            "rate": rate,
-            "operator": username,
-            "time": get_beijing_time().strftime("%H:%M:%S"),
-            "msg_id": update.message.message_id
-        }
-
-        try:
-            add_record(chat_id, record)
-        except Exception as e:
-            await update.message.reply_text(f"⚠️ 记录失败: {e}")
-            return False
-
-        bill_text, bill_markup = generate_bill(chat_id)
-        await context.bot.send_message(chat_id=chat_id, text=bill_text, reply_markup=bill_markup)
+    await send_bill(context, chat_id)
+    return False
+
+# ---------- 下发 ----------
+@router.route(send_pattern, prefix="下发")
+async def handle_payout(update, context, m):
+    chat_id, user, username = _sender(update)
+    if not _is_activated(chat_id):
+        await update.message.reply_text("⚠️ 记账模块未激活，请先执行：开始")
         return False
 
-    # ---------- 下发 ----------
-    m = send_pattern.match(text)
-    if m:
-        activated = group_activation_status.get(chat_id, set())
-        if not REQUIRED_COMMANDS.issubset(activated):
-            await update.message.reply_text("⚠️ 记账模块未激活，请先执行：开始")
-            return False
-
-        if not is_authorized(user.id, username, chat_id, context):
-            await update.message.reply_text("⚠️ 只有超级管理员或操作人可以下发")
-            return False
-
-        raw_amount = float(m.group(1))
-        is_usd = bool(m.group(2))
-        group_conf = get_group_config(chat_id)
-        rate = group_conf["rate"]
-        amount_usd, amount_rmb = (raw_amount, raw_amount * rate) if is_usd else (raw_amount / rate, raw_amount)
-
-        record = {
-            "type": "下发",
-            "user": username,
-            "display_name": user.full_name or username,
-            "amount_rmb": amount_rmb,
-            "amount_usd": amount_usd,
-            "rate": rate,
-            "operator": username,
-            "time": get_beijing_time().strftime("%m-%d %H:%M:%S"),
-            "msg_id": update.message.message_id
-        }
-
-        try:
-            add_record(chat_id, record)
-        except Exception as e:
-            await update.message.reply_text(f"⚠️ 下发记录失败: {e}")
-            return False
-
-        bill_text, bill_markup = generate_bill(chat_id)
-        await context.bot.send_message(chat_id=chat_id, text=bill_text, reply_markup=bill_markup)
+    if not is_authorized(user.id, username, chat_id, context):
+        await update.message.reply_text("⚠️ 只有超级管理员或操作人可以下发")
         return False
 
-    # ---------- 设置汇率 ----------
-    m = set_rate_pattern.match(text)
-    if m:
-        if not is_authorized(user.id, username, chat_id, context):
-            await update.message.reply_text("⚠️ 只有超级管理员或操作人可以设置汇率")
-            return False
-        rate = float(m.group(1))
-        set_group_rate(chat_id, rate)
-        group_activation_status.setdefault(chat_id, set()).add("设置汇率")
-        await update.message.reply_text(f"✅ 已设置汇率：{rate}")
+    raw_amount = float(m.group(1))
+    is_usd = bool(m.group(2))
+    group_conf = await run_db(get_group_config, chat_id)
+    rate = group_conf["rate"]
+    amount_usd, amount_rmb = (raw_amount, raw_amount * rate) if is_usd else (raw_amount / rate, raw_amount)
+
+    record = {
+        "type": "下发",
+        "user": username,
+        "display_name": user.full_name or username,
+        "amount_rmb": amount_rmb,
+        "amount_usd": amount_usd,
+        "rate": rate,
+        "operator": username,
+        "time": get_beijing_time().strftime("%m-%d %H:%M:%S"),
+        "msg_id": update.message.message_id
+    }
+
+    try:
+        await run_db(add_record, chat_id, record)
+    except Exception as e:
+        await update.message.reply_text(f"⚠️ 下发记录失败: {e}")
         return False
 
-    # ---------- 设置费率 ----------
-    m = set_fee_pattern.match(text)
-    if m:
-        if not is_authorized(user.id, username, chat_id, context):
-            await update.message.reply_text("⚠️ 只有超级管理员或操作人可以设置费率")
-            return False
-        fee = float(m.group(1))
-        set_group_fee(chat_id, fee)
-        group_activation_status.setdefault(chat_id, set()).add("设置费率")
-        await update.message.reply_text(f"✅ 已设置费率：{fee}%")
+    await send_bill(context, chat_id)
+    return False
+
+# ---------- 设置汇率 ----------
+@router.route(set_rate_pattern, prefix="设置汇率")
+async def handle_set_rate(update, context, m):
+    chat_id, user, username = _sender(update)
+    if not is_authorized(user.id, username, chat_id, context):
+        await update.message.reply_text("⚠️ 只有超级管理员或操作人可以设置汇率")
         return False
+    rate = float(m.group(1))
+    await run_db(set_group_rate, chat_id, rate)
+    group_activation_status.setdefault(chat_id, set()).add("设置汇率")
+    await update.message.reply_text(f"✅ 已设置汇率：{rate}")
+    return False
 
-    # ---------- 设置日切 ----------
-    m = set_reset_pattern.match(text)
-    if m:
-        if not is_authorized(user.id, username, chat_id, context):
-            await update.message.reply_text("⚠️ 只有超级管理员或操作人可以设置日切")
-            return False
-        hour = int(m.group(1))
-        if not 0 <= hour <= 23:
-            await update.message.reply_text("⚠️ 日切小时必须在 0~23 之间")
-            return False
-        set_group_daily_reset(chat_id, hour)
-        await update.message.reply_text(f"✅ 已设置日切时间为每天 {hour} 点")
+# ---------- 设置费率 ----------
+@router.route(set_fee_pattern, prefix="设置费率")
+async def handle_set_fee(update, context, m):
+    chat_id, user, username = _sender(update)
+    if not is_authorized(user.id, username, chat_id, context):
+        await update.message.reply_text("⚠️ 只有超级管理员或操作人可以设置费率")
         return False
+    fee = float(m.group(1))
+    await run_db(set_group_fee, chat_id, fee)
+    group_activation_status.setdefault(chat_id, set()).add("设置费率")
+    await update.message.reply_text(f"✅ 已设置费率：{fee}%")
+    return False
 
-    # ---------- 删除账单 ----------
-    if del_bill_pattern.match(text):
-        if not is_authorized(user.id, username, chat_id, context):
-            await update.message.reply_text("⚠️ 只有超级管理员或操作人可以删除账单")
-            return False
-        result = delete_records(chat_id)
-        group_activation_status[chat_id] = set()
-        await update.message.reply_text(f"{result}\n⚠️ 记账模块已重置，需要重新激活")
+# ---------- 设置日切 ----------
+@router.route(set_reset_pattern, prefix="设置日切")
+async def handle_set_daily_reset(update, context, m):
+    chat_id, user, username = _sender(update)
+    if not is_authorized(user.id, username, chat_id, context):
+        await update.message.reply_text("⚠️ 只有超级管理员或操作人可以设置日切")
         return False
+    hour = int(m.group(1))
+    if not 0 <= hour <= 23:
+        await update.message.reply_text("⚠️ 日切小时必须在 0~23 之间")
+        return False
+    await run_db(set_group_daily_reset, chat_id, hour)
+    await update.message.reply_text(f"✅ 已设置日切时间为每天 {hour} 点")
+    return False
 
-    # ---------- 撤销 ----------
-    if text.startswith("撤销"):
-        if not is_authorized(user.id, username, chat_id, context):
-            await update.message.reply_text("⚠️ 只有超级管理员或操作人可以撤销")
-            return False
-        is_reply = update.message.reply_to_message is not None
-        reply_msg_id = update.message.reply_to_message.message_id if is_reply else None
-        if is_reply and reply_msg_id:
-            result = remove_record_by_msgid(chat_id, reply_msg_id)
-            await update.message.reply_text(result)
-        else:
-            await update.message.reply_text("⚠️ 撤销必须回复某条记账消息")
+# ---------- 实时账单 ----------
+@router.route(live_bill_pattern, prefix="开启")
+@router.route(live_bill_pattern, prefix="关闭")
+async def handle_live_bill(update, context, m):
+    chat_id, user, username = _sender(update)
+    if not is_authorized(user.id, username, chat_id, context):
+        await update.message.reply_text("⚠️ 只有超级管理员或操作人可以设置实时账单")
         return False
+    enabled = m.group(1) == "开启"
+    await run_db(set_group_live_bill, chat_id, enabled)
+    await update.message.reply_text("✅ 已开启实时账单，记账后将更新同一条账单消息" if enabled else "✅ 已关闭实时账单")
+    return False
 
-    # ---------- 操作人管理 ----------
-    m = add_op_pattern.match(text)
-    if m:
-        if not is_super_admin(user.id, context):
-            await update.message.reply_text("⚠️ 只有超级管理员可以添加操作人")
-            return False
-        op = m.group(1)
-        add_operator(chat_id, op)
-        group_operators.setdefault(chat_id, set()).add(op)
-        await update.message.reply_text(f"✅ 已添加操作人 @{op}")
+# ---------- 删除账单 ----------
+@router.route(del_bill_pattern, prefix="删除账单")
+async def handle_delete_bill(update, context, m):
+    chat_id, user, username = _sender(update)
+    if not is_authorized(user.id, username, chat_id, context):
+        await update.message.reply_text("⚠️ 只有超级管理员或操作人可以删除账单")
         return False
+    result = await run_db(delete_records, chat_id)
+    group_activation_status[chat_id] = set()
+    await update.message.reply_text(f"{result}\n⚠️ 记账模块已重置，需要重新激活")
+    return False
 
-    m = del_op_pattern.match(text)
-    if m:
-        if not is_super_admin(user.id, context):
-            await update.message.reply_text("⚠️ 只有超级管理员可以删除操作人")
-            return False
-        op = m.group(1)
-        remove_operator(chat_id, op)
-        group_operators.get(chat_id, set()).discard(op)
-        await update.message.reply_text(f"🗑 已删除操作人 @{op}")
+# ---------- 撤销 ----------
+@router.route(cancel_route_pattern, prefix="撤销")
+async def handle_cancel(update, context, m):
+    chat_id, user, username = _sender(update)
+    if not is_authorized(user.id, username, chat_id, context):
+        await update.message.reply_text("⚠️ 只有超级管理员或操作人可以撤销")
         return False
+    is_reply = update.message.reply_to_message is not None
+    reply_msg_id = update.message.reply_to_message.message_id if is_reply else None
+    if is_reply and reply_msg_id:
+        result = await run_db(remove_record_by_msgid, chat_id, reply_msg_id)
+        await update.message.reply_text(result)
+    else:
+        await update.message.reply_text("⚠️ 撤销必须回复某条记账消息")
+    return False
 
-    if show_op_pattern.match(text):
-        operators = get_operators(chat_id)
-        ops = ", ".join([f"@{o}" for o in operators]) or "暂无"
-        await update.message.reply_text(f"👥 当前操作人：{ops}")
+# ---------- 操作人管理 ----------
+@router.route(add_op_pattern, prefix="设置操作人")
+async def handle_add_operator(update, context, m):
+    chat_id, user, _ = _sender(update)
+    if not is_super_admin(user.id, context):
+        await update.message.reply_text("⚠️ 只有超级管理员可以添加操作人")
         return False
+    op = m.group(1)
+    await run_db(add_operator, chat_id, op)
+    group_operators.setdefault(chat_id, set()).add(op)
+    await update.message.reply_text(f"✅ 已添加操作人 @{op}")
+    return False
 
-    # 添加地址
-    m = add_addr_pattern.match(text)
-    if m:
-        address = m.group(1)
-        remark = m.group(2) or ""
-        add_wallet_address_db(chat_id, address, remark)
-        await update.message.reply_text(f"✅ 已添加地址：{address}\n备注：{remark}")
-        return True
-
-    # 删除地址
-    m = del_addr_pattern.match(text)
-    if m:
-        address = m.group(1)
-        deleted = delete_wallet_address_db(chat_id, address)
-        if deleted:
-            await update.message.reply_text(f"✅ 已删除地址：{address}")
-        else:
-            await update.message.reply_text(f"⚠️ 未找到地址：{address}")
-        return True
-
-    # 显示地址
-    if show_addr_pattern.match(text):
-        rows = get_wallet_addresses_db(chat_id)
-        if not rows:
-            await update.message.reply_text("⚠️ 本群暂无监控地址")
-        else:
-            msg_lines = ["📌 本群监控地址："]
-            for r in rows:
-                remark = f"（{r['remark']}）" if r['remark'] else ""
-                msg_lines.append(f"{r['address']}{remark}")
-            await update.message.reply_text("\n".join(msg_lines))
-        return True
+@router.route(del_op_pattern, prefix="删除操作人")
+async def handle_remove_operator(update, context, m):
+    chat_id, user, _ = _sender(update)
+    if not is_super_admin(user.id, context):
+        await update.message.reply_text("⚠️ 只有超级管理员可以删除操作人")
+        return False
+    op = m.group(1)
+    await run_db(remove_operator, chat_id, op)
+    group_operators.get(chat_id, set()).discard(op)
+    await update.message.reply_text(f"🗑 已删除操作人 @{op}")
+    return False
 
+@router.route(show_op_pattern, prefix="显示操作人")
+async def handle_show_operators(update, context, m):
+    operators = await run_db(get_operators, update.effective_chat.id)
+    ops = ", ".join([f"@{o}" for o in operators]) or "暂无"
+    await update.message.reply_text(f"👥 当前操作人：{ops}")
     return False
+
+# ---------- 地址管理 ----------
+@router.route(add_addr_pattern, prefix="设置地址")
+async def handle_add_address(update, context, m):
+    chat_id = update.effective_chat.id
+    address = m.group(1)
+    remark = m.group(2) or ""
+    await run_db(add_wallet_address_db, chat_id, address, remark)
+    listener = context.bot_data.get("tron_listener")
+    if listener:
+        listener.add_address({"chat_id": chat_id, "address": address, "remark": remark})
+    await update.message.reply_text(f"✅ 已添加地址：{address}\n备注：{remark}")
+    return True
+
+@router.route(del_addr_pattern, prefix="删除地址")
+async def handle_delete_address(update, context, m):
+    chat_id = update.effective_chat.id
+    address = m.group(1)
+    deleted = await run_db(delete_wallet_address_db, chat_id, address)
+    listener = context.bot_data.get("tron_listener")
+    if listener:
+        listener.remove_address(chat_id, address)
+    if deleted:
+        await update.message.reply_text(f"✅ 已删除地址：{address}")
+    else:
+        await update.message.reply_text(f"⚠️ 未找到地址：{address}")
+    return True
+
+@router.route(show_addr_pattern, prefix="显示地址")
+async def handle_show_addresses(update, context, m):
+    rows = await run_db(get_wallet_addresses_db, update.effective_chat.id)
+    if not rows:
+        await update.message.reply_text("⚠️ 本群暂无监控地址")
+    else:
+        msg_lines = ["📌 本群监控地址："]
+        for r in rows:
+            remark = f"（{r['remark']}）" if r['remark'] else ""
+            msg_lines.append(f"{r['address']}{remark}")
+        await update.message.reply_text("\n".join(msg_lines))
+    return True
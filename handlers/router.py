@@ -0,0 +1,60 @@
+import re
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+Handler = Callable[..., Awaitable[bool]]
+
+class Route(NamedTuple):
+    pattern: Optional[re.Pattern]
+    handler: Handler
+    prefix: str = ""
+    contains: str = ""
+
+class CommandRouter:
+    """
+    表驱动的命令分发：按消息首字符查表，只对同一首字符下前缀相符的命令做一次正则匹配
+    - prefix 路由：以固定前缀开头的命令（设置汇率、下发、+0 ...），按前缀首字符索引
+    - first_chars 路由：以某类字符开头的输入（地址、计算式），按给定字符逐个索引
+    - contains 路由：无法按首字符区分的输入（如「名字+金额」），首字符未命中后按特征字符检查
+    普通聊天查表不中、也不含特征字符，直接返回 None
+    """
+
+    def __init__(self):
+        self._by_first_char: Dict[str, List[Route]] = {}
+        self._fallbacks: List[Route] = []
+
+    def route(self, pattern: Optional[re.Pattern] = None, *, prefix: str = "",
+              first_chars: Iterable[str] = (), contains: str = "") -> Callable[[Handler], Handler]:
+        """注册处理函数：handler(update, context, match)；pattern 为 None 时只按前缀匹配"""
+        def decorator(handler: Handler) -> Handler:
+            route = Route(pattern, handler, prefix, contains)
+            if prefix:
+                self._by_first_char.setdefault(prefix[0], []).append(route)
+            for char in first_chars:
+                self._by_first_char.setdefault(char, []).append(route)
+            if contains:
+                self._fallbacks.append(route)
+            return handler
+        return decorator
+
+    @staticmethod
+    def _match(route: Route, text: str):
+        if route.prefix and not text.startswith(route.prefix):
+            return None
+        if route.pattern is None:
+            return True
+        return route.pattern.match(text)
+
+    def resolve(self, text: str) -> Optional[Tuple[Handler, object]]:
+        """返回 (处理函数, 正则匹配结果)，不是命令时返回 None"""
+        if not text:
+            return None
+        for route in self._by_first_char.get(text[0], ()):
+            m = self._match(route, text)
+            if m:
+                return route.handler, m
+        for route in self._fallbacks:
+            if route.contains in text:
+                m = self._match(route, text)
+                if m:
+                    return route.handler, m
+        return None
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from typing import Dict, Set
+
+from telegram.error import BadRequest
+from async_db import run_db
+from db import get_group_config
+from report import generate_bill
+import config
+
+logger = logging.getLogger("Live_Bill")
+
+class LiveBill:
+    """
+    防抖的账单渲染：记账后等待 BILL_DEBOUNCE_SECONDS，窗口内的多次记账只渲染、发送一次
+    群组开启实时账单后，原地编辑上一条账单消息，而不是每次发一条新账单
+    """
+
+    def __init__(self, outbox):
+        self.outbox = outbox
+        self.message_ids: Dict[int, int] = {}  # 每个群当前的实时账单消息
+        self.message_texts: Dict[int, str] = {}  # 实时账单消息当前显示的内容
+        self._pending: Dict[int, dict] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, chat_id: int, force_new: bool = False) -> None:
+        """安排一次账单刷新；force_new 表示必须发新消息（如 +0 查看账单）"""
+        pending = self._pending.get(chat_id)
+        if pending is not None:
+            pending["force_new"] |= force_new
+            return
+        self._pending[chat_id] = {"force_new": force_new}
+        task = asyncio.create_task(self._render_later(chat_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _render_later(self, chat_id: int) -> None:
+        await asyncio.sleep(config.BILL_DEBOUNCE_SECONDS)
+        options = self._pending.pop(chat_id)
+        try:
+            group_conf = await run_db(get_group_config, chat_id)
+            bill_text, bill_markup = await run_db(generate_bill, chat_id)
+
+            message_id = self.message_ids.get(chat_id)
+            if group_conf.get("live_bill") and message_id and not options["force_new"]:
+                if self.message_texts.get(chat_id) == bill_text:
+                    return  # 内容未变化，不必编辑
+                try:
+                    await self.outbox.edit_bill(chat_id, message_id, bill_text, bill_markup)
+                    self.message_texts[chat_id] = bill_text
+                    return
+                except BadRequest as e:
+                    if "not modified" in str(e).lower():
+                        self.message_texts[chat_id] = bill_text
+                        return
+                    # 原消息已删除或无法编辑，改发新消息
+                    logger.warning(f"聊天 {chat_id} 的实时账单无法编辑，重新发送: {e}")
+
+            message = await self.outbox.send_bill(chat_id, bill_text, bill_markup)
+            self.message_ids[chat_id] = message.message_id
+            self.message_texts[chat_id] = bill_text
+        except Exception as e:
+            logger.error(f"聊天 {chat_id} 刷新账单失败: {e}")
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import timedelta
+from typing import Dict, Optional, Set
+
+from telegram import Bot
+from telegram.error import RetryAfter
+from rate_limit import TokenBucket
+import config
+
+logger = logging.getLogger("Outbox")
+
+MAX_MESSAGE_LENGTH = 4096  # Telegram 单条消息长度上限
+MAX_ATTEMPTS = 5  # 单条消息遇到 RetryAfter 的最大重试次数
+
+class Outbox:
+    """
+    统一的 Telegram 发送队列
+    - 全局与每个群各一个令牌桶，避免触发 Telegram 的频率限制
+    - 遇到 RetryAfter 时暂停该群并把消息放回队首重试
+    - 合并：同一个群排队中的账单（或对同一账单消息的编辑）只保留最新一份，钱包报账合并为一条消息
+    同一个群的消息按入队顺序逐条发送
+    """
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.global_bucket = TokenBucket(config.TG_GLOBAL_RATE, config.TG_GLOBAL_BURST)
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self.queues: Dict[int, deque] = {}
+        self._busy: Set[int] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = {"sent": 0, "coalesced": 0, "retry_after": 0, "failed": 0}
+
+    # ---------- 入队 ----------
+    def _enqueue(self, chat_id: int, item: dict) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        item.setdefault("futures", []).append(loop.create_future())
+        item.setdefault("attempts", 0)
+        self.queues.setdefault(chat_id, deque()).append(item)
+        self._ensure_worker()
+        return item["futures"][-1]
+
+    def _pending(self, chat_id: int, kind: str) -> Optional[dict]:
+        """同一群中排队尚未发送的指定类型消息"""
+        for item in self.queues.get(chat_id, ()):
+            if item["kind"] == kind:
+                return item
+        return None
+
+    def send(self, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        """普通消息，不合并"""
+        return self._enqueue(chat_id, {"kind": "text", "text": text, "kwargs": kwargs})
+
+    def send_bill(self, chat_id: int, text: str, reply_markup=None) -> asyncio.Future:
+        """账单：排队中已有账单时直接替换成最新内容"""
+        item = self._pending(chat_id, "bill")
+        if item is not None:
+            item["text"] = text
+            item["kwargs"] = {"reply_markup": reply_markup}
+            item["futures"].append(asyncio.get_running_loop().create_future())
+            self.stats["coalesced"] += 1
+            return item["futures"][-1]
+        return self._enqueue(chat_id, {"kind": "bill", "text": text, "kwargs": {"reply_markup": reply_markup}})
+
+    def send_wallet_report(self, chat_id: int, text: str) -> asyncio.Future:
+        """钱包报账：排队中已有报账时合并为一条（不超过消息长度上限）"""
+        item = self._pending(chat_id, "wallet")
+        if item is not None and len(item["text"]) + len(text) + 2 <= MAX_MESSAGE_LENGTH:
+            item["text"] = f"{item['text']}\n\n{text}"
+            item["futures"].append(asyncio.get_running_loop().create_future())
+            self.stats["coalesced"] += 1
+            return item["futures"][-1]
+        return self._enqueue(chat_id, {"kind": "wallet", "text": text, "kwargs": {}})
+
+    def edit_bill(self, chat_id: int, message_id: int, text: str, reply_markup=None) -> asyncio.Future:
+        """原地编辑账单消息：排队中已有对同一消息的编辑时替换成最新内容"""
+        for item in self.queues.get(chat_id, ()):
+            if item["kind"] == "edit" and item["message_id"] == message_id:
+                item["text"] = text
+                item["kwargs"] = {"reply_markup": reply_markup}
+                item["futures"].append(asyncio.get_running_loop().create_future())
+                self.stats["coalesced"] += 1
+                return item["futures"][-1]
+        return self._enqueue(chat_id, {
+            "kind": "edit", "message_id": message_id, "text": text, "kwargs": {"reply_markup": reply_markup}
+        })
+
+    # ---------- 发送 ----------
+    def _ensure_worker(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(config.TG_CHAT_RATE, config.TG_CHAT_BURST)
+        return bucket
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            next_delay = None
+            for chat_id in list(self.queues):
+                if chat_id in self._busy:
+                    continue
+                if not self.queues[chat_id]:
+                    del self.queues[chat_id]
+                    continue
+                bucket = self._chat_bucket(chat_id)
+                delay = max(bucket.delay(), self.global_bucket.delay())
+                if delay > 0:
+                    next_delay = delay if next_delay is None else min(next_delay, delay)
+                    continue
+                bucket.try_acquire()
+                self.global_bucket.try_acquire()
+                self._busy.add(chat_id)
+                asyncio.create_task(self._deliver(chat_id, self.queues[chat_id].popleft()))
+
+            if not self.queues and not self._busy:
+                await self._wakeup.wait()
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=next_delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, chat_id: int, item: dict) -> None:
+        try:
+            if item["kind"] == "edit":
+                message = await self.bot.edit_message_text(
+                    chat_id=chat_id, message_id=item["message_id"], text=item["text"], **item["kwargs"]
+                )
+            else:
+                message = await self.bot.send_message(chat_id=chat_id, text=item["text"], **item["kwargs"])
+            self.stats["sent"] += 1
+            for future in item["futures"]:
+                if not future.done():
+                    future.set_result(message)
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else float(e.retry_after)
+            self.stats["retry_after"] += 1
+            item["attempts"] += 1
+            self._chat_bucket(chat_id).pause(retry_after)
+            if item["attempts"] < MAX_ATTEMPTS:
+                logger.warning(f"聊天 {chat_id} 触发频率限制，{retry_after}s 后重试")
+                self.queues.setdefault(chat_id, deque()).appendleft(item)
+            else:
+                self._fail(item, e)
+        except Exception as e:
+            self._fail(item, e)
+        finally:
+            self._busy.discard(chat_id)
+            self._wakeup.set()
+
+    def _fail(self, item: dict, error: Exception) -> None:
+        self.stats["failed"] += 1
+        logger.error(f"消息发送失败: {error}")
+        for future in item["futures"]:
+            if not future.done():
+                future.set_exception(error)
+                future.exception()  # 标记为已读取，没有调用方等待时不产生警告
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+        logger.info(f"发送队列统计: {self.stats}")
@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+class PageCache:
+    """
+    按字节数限制大小的页面缓存（LRU）
+    每个键对应一份已渲染的页面，值为 {编码: 字节串}（'identity' 为原文，另可缓存 gzip/br 压缩结果），
+    总字节数超过 max_bytes 时从最久未使用的一端淘汰；多线程服务器下用锁保护
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 8
+        self._entries: "OrderedDict[Hashable, dict]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, key: Hashable, encoding: str = "identity") -> Optional[bytes]:
+        with self._lock:
+            variants = self._entries.get(key)
+            if variants is None or encoding not in variants:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return variants[encoding]
+
+    def put(self, key: Hashable, data: bytes, encoding: str = "identity") -> None:
+        """缓存一种编码的页面；超过单条上限的页面不缓存"""
+        if len(data) > self.max_entry_bytes:
+            return
+        with self._lock:
+            variants = self._entries.get(key)
+            if variants is None:
+                variants = self._entries[key] = {}
+            else:
+                self._entries.move_to_end(key)
+            self._size += len(data) - len(variants.get(encoding, b""))
+            variants[encoding] = data
+
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= sum(len(v) for v in evicted.values())
+                self.stats["evictions"] += 1
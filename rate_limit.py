@@ -0,0 +1,90 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+class TokenBucket:
+    """
+    异步令牌桶：平均每秒 rate 个令牌，最多积攒 burst 个
+    pause() 用于遵守服务端的 Retry-After，暂停期间所有调用方都会等待
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.total_wait = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """不等待地取一个令牌，取不到返回 False"""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return False
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def delay(self) -> float:
+        """距离下一个令牌可用还需等待的秒数"""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> float:
+        """取一个令牌，返回等待的秒数"""
+        start = time.monotonic()
+        async with self._lock:
+            while True:
+                if self.try_acquire():
+                    break
+                await asyncio.sleep(self.delay())
+        waited = time.monotonic() - start
+        self.total_wait += waited
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class AIMDLimiter:
+    """
+    加性增 / 乘性减的并发控制：请求成功时并发上限缓慢增加，
+    遇到限流或服务端错误时减半
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 20, decrease_factor: float = 0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._cond = None  # 第一次使用时在事件循环内创建
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_throttle(self) -> None:
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from typing import Iterable
+
+# ---------- 配置 ----------
+PER_ADDRESS_LIMIT = 200      # 单个地址最多缓存的交易 ID 数
+TOTAL_LIMIT = 50_000         # 所有地址合计上限（内存预算）
+TTL_SECONDS = 24 * 3600      # 交易 ID 在缓存中的存活时间
+
+class SeenTxCache:
+    """
+    有界的已处理交易缓存
+    每个地址一个按最近使用排序的 OrderedDict（tx_id -> 写入时间），
+    超出单地址上限、总上限或 TTL 时从最久未使用的一端淘汰。
+    缓存只是快速路径，未命中时由调用方回查数据库确认
+    """
+
+    def __init__(self, per_address: int = PER_ADDRESS_LIMIT, max_total: int = TOTAL_LIMIT, ttl: float = TTL_SECONDS):
+        self.per_address = per_address
+        self.max_total = max_total
+        self.ttl = ttl
+        self._addresses: "OrderedDict[str, OrderedDict[str, float]]" = OrderedDict()
+        self._total = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return self._total
+
+    def address_count(self) -> int:
+        return len(self._addresses)
+
+    def _expire(self, address: str, entries: "OrderedDict[str, float]", now: float) -> None:
+        while entries:
+            tx_id, stamp = next(iter(entries.items()))
+            if now - stamp < self.ttl:
+                break
+            entries.popitem(last=False)
+            self._total -= 1
+            self.evictions += 1
+        if not entries:
+            del self._addresses[address]
+
+    def contains(self, address: str, tx_id: str) -> bool:
+        entries = self._addresses.get(address)
+        if entries is None or tx_id not in entries:
+            return False
+        now = time.monotonic()
+        if now - entries[tx_id] >= self.ttl:
+            self._expire(address, entries, now)
+            return tx_id in self._addresses.get(address, ())
+        entries.move_to_end(tx_id)
+        self._addresses.move_to_end(address)
+        return True
+
+    def add(self, address: str, tx_id: str) -> None:
+        now = time.monotonic()
+        entries = self._addresses.get(address)
+        if entries is None:
+            entries = self._addresses[address] = OrderedDict()
+        else:
+            self._addresses.move_to_end(address)
+        if tx_id not in entries:
+            self._total += 1
+        entries[tx_id] = now
+        entries.move_to_end(tx_id)
+
+        # 单地址上限
+        while len(entries) > self.per_address:
+            entries.popitem(last=False)
+            self._total -= 1
+            self.evictions += 1
+        self._expire(address, entries, now)
+
+        # 全局预算：从最久未使用的地址开始淘汰
+        while self._total > self.max_total:
+            oldest_address, oldest_entries = next(iter(self._addresses.items()))
+            oldest_entries.popitem(last=False)
+            self._total -= 1
+            self.evictions += 1
+            if not oldest_entries:
+                del self._addresses[oldest_address]
+
+    def update(self, address: str, tx_ids: Iterable[str]) -> None:
+        for tx_id in tx_ids:
+            self.add(address, tx_id)
+
+    def discard_address(self, address: str) -> None:
+        entries = self._addresses.pop(address, None)
+        if entries:
+            self._total -= len(entries)
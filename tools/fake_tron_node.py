@@ -0,0 +1,97 @@
+"""
+本地模拟 TronGrid 节点，用录制的事件 JSON 测试 TronListener（两种接入模式都支持）
+
+录制文件格式:
+    {
+        "events": [TronGrid /v1/contracts/{合约}/events 返回的 data 项, ...],
+        "balances": {"T...": 123.45, ...}
+    }
+
+用法:
+    python tools/fake_tron_node.py recorded.json --port 8090
+    TRONGRID_API_URL=http://127.0.0.1:8090 TRON_INGEST_MODE=events python bot.py
+
+运行中可 POST /events（JSON 数组）追加新事件，模拟出块
+"""
+import argparse
+import json
+import os
+import sys
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tron_listener import USDT_CONTRACT, tron_hex_to_base58  # noqa: E402
+
+def paginate(request, items, ts_param):
+    """按 min 时间过滤、按时间排序，并用偏移量充当 fingerprint 翻页"""
+    min_ts = int(request.query.get(ts_param, 0))
+    limit = int(request.query.get("limit", 20))
+    offset = int(request.query.get("fingerprint", 0))
+    desc = request.query.get("order_by", "block_timestamp,desc").endswith("desc")
+    items = sorted(
+        (i for i in items if i["block_timestamp"] >= min_ts),
+        key=lambda i: i["block_timestamp"], reverse=desc
+    )
+    page = items[offset:offset + limit]
+    meta = {"page_size": len(page)}
+    if offset + limit < len(items):
+        meta["fingerprint"] = str(offset + limit)
+    return web.json_response({"data": page, "success": True, "meta": meta})
+
+async def contract_events(request):
+    if request.match_info["contract"] != USDT_CONTRACT:
+        return web.json_response({"data": [], "success": True, "meta": {}})
+    return paginate(request, request.app["events"], "min_block_timestamp")
+
+async def account_trc20(request):
+    address = request.match_info["address"]
+    transfers = []
+    for event in request.app["events"]:
+        result = event.get("result", {})
+        tx = {
+            "transaction_id": event["transaction_id"],
+            "block_timestamp": event["block_timestamp"],
+            "from": tron_hex_to_base58(result.get("from", "")),
+            "to": tron_hex_to_base58(result.get("to", "")),
+            "value": result.get("value", "0"),
+        }
+        if address in (tx["from"], tx["to"]):
+            transfers.append(tx)
+    return paginate(request, transfers, "min_timestamp")
+
+async def account(request):
+    address = request.match_info["address"]
+    balance = request.app["balances"].get(address, 0)
+    data = [{"address": address, "trc20": [{USDT_CONTRACT: str(int(balance * 1_000_000))}]}]
+    return web.json_response({"data": data, "success": True, "meta": {}})
+
+async def append_events(request):
+    new_events = await request.json()
+    request.app["events"].extend(new_events)
+    return web.json_response({"added": len(new_events), "total": len(request.app["events"])})
+
+def build_app(recorded: dict) -> web.Application:
+    app = web.Application()
+    app["events"] = list(recorded.get("events", []))
+    app["balances"] = dict(recorded.get("balances", {}))
+    app.router.add_get("/v1/contracts/{contract}/events", contract_events)
+    app.router.add_get("/v1/accounts/{address}/transactions/trc20", account_trc20)
+    app.router.add_get("/v1/accounts/{address}", account)
+    app.router.add_post("/events", append_events)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 TronGrid 节点")
+    parser.add_argument("recorded", help="录制的事件 JSON 文件")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    with open(args.recorded, "r") as f:
+        recorded = json.load(f)
+    web.run_app(build_app(recorded), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+完整账单网页压测：先向 SQLite 写入测试数据，再并发请求 /bill/<chat_id>，统计吞吐与延迟
+
+用法:
+    # 1. 生成测试库（默认 -100123 群 100000 条记录）
+    DB_PATH=load.db python tools/load_test_bill.py seed --records 100000
+    # 2. 用同一个库启动网页服务
+    DB_PATH=load.db gunicorn -c gunicorn.conf.py wsgi:app
+    # 3. 并发压测
+    python tools/load_test_bill.py run --url http://127.0.0.1:8000 --concurrency 20 --requests 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_CHAT_ID = -100123
+
+def seed(chat_id, n):
+    import db
+
+    db.init_db()
+    names = [f"客户{i}" for i in range(50)]
+    now = int(time.time())
+    start = time.perf_counter()
+    for i in range(n):
+        r_type = "入款" if random.random() < 0.7 else "下发"
+        rmb = float(random.randint(100, 50000))
+        ts = now - (n - i) * 30  # 每 30 秒一笔，跨越多个账期
+        db.add_record(chat_id, {
+            "type": r_type,
+            "user": "load",
+            "display_name": random.choice(names),
+            "amount_rmb": rmb,
+            "amount_usd": rmb / 7.2,
+            "rate": 7.2,
+            "operator": "load",
+            "time": time.strftime("%H:%M:%S", time.localtime(ts)),
+            "msg_id": i,
+            "ts": ts,
+        })
+    db.close_db()
+    print(f"已写入 {n} 条记录到 {db.DB_PATH}（群 {chat_id}），耗时 {time.perf_counter() - start:.1f}s")
+
+async def run(url, chat_id, concurrency, total):
+    target = f"{url.rstrip('/')}/bill/{chat_id}"
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async def worker(session):
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                async with session.get(target) as resp:
+                    await resp.read()
+                    if resp.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{target}  并发 {concurrency}  请求 {total}  失败 {errors}")
+    if not latencies:
+        return
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    print(f"吞吐 {len(latencies) / elapsed:.1f} req/s  "
+          f"p50 {pct(0.5):.1f}ms  p95 {pct(0.95):.1f}ms  p99 {pct(0.99):.1f}ms  max {latencies[-1] * 1000:.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="完整账单网页压测")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = sub.add_parser("seed", help="写入测试数据（库路径由 DB_PATH 指定）")
+    seed_parser.add_argument("--chat-id", type=int, default=DEFAULT_CHAT_ID)
+    seed_parser.add_argument("--records", type=int, default=100_000)
+
+    run_parser = sub.add_parser("run", help="并发请求 /bill/<chat_id>")
+    run_parser.add_argument("--url", default="http://127.0.0.1:8000")
+    run_parser.add_argument("--chat-id", type=int, default=DEFAULT_CHAT_ID)
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("--requests", type=int, default=500)
+
+    args = parser.parse_args()
+    if args.command == "seed":
+        seed(args.chat_id, args.records)
+    else:
+        asyncio.run(run(args.url, args.chat_id, args.concurrency, args.requests))
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,21 @@
 import asyncio
 import aiohttp
+import hashlib
+import heapq
+import itertools
 import json
 import logging
 import os
 import math
+import time
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Set
 from telegram import Bot
-from db import get_all_wallet_addresses
+from db import get_all_wallet_addresses, load_tron_state, save_tron_state, prune_tron_seen, filter_seen_txs
+from async_db import run_db
+from rate_limit import TokenBucket, AIMDLimiter
+from seen_cache import SeenTxCache
+import config
 
 # 配置日志
 logging.basicConfig(
@@ -21,98 +29,356 @@ logging.basicConfig(
 logger = logging.getLogger("TRON_Listener")
 
 # TRON 监听器配置
-CHECK_INTERVAL = 45  # 每 45 秒检查一次
-PERSISTENCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "last_tx_state.json")  # 持久化存储文件
+CHECK_INTERVAL = 45  # 新地址的初始轮询间隔，也是新地址在时间轴上均匀分布的周期
+IDLE_BACKOFF = 1.5  # 无新交易时轮询间隔放大倍数
+ADDRESS_RESYNC_INTERVAL = 300  # 与数据库核对监控地址列表的间隔（兜底，正常由命令直接通知）
+SAVE_INTERVAL = CHECK_INTERVAL * 10  # 持久化数据保存间隔
+HTTP_POOL_LIMIT = 20  # 连接池总连接数
+HTTP_POOL_LIMIT_PER_HOST = 10  # 单个主机的连接数
+HTTP_KEEPALIVE_TIMEOUT = 60  # 空闲连接保持时间（秒）
+DNS_CACHE_TTL = 300  # DNS 缓存时间（秒）
+LEGACY_PERSISTENCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "last_tx_state.json")  # 旧版 JSON 持久化文件，启动时导入一次
+SEEN_TX_RETENTION = 7 * 24 * 3600  # 已推送交易在数据库中的保留时间（秒）
+
+USDT_CONTRACT = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"  # USDT(TRC20) 合约地址
+EVENT_CURSOR_KEY = "__usdt_transfer_events__"  # 事件扫描模式的全局游标在 tron_cursors 表中的键
+EVENT_SCAN_INTERVAL = 3  # 事件扫描间隔（秒），约等于出块时间
+EVENT_START_LOOKBACK = 60  # 首次扫描时回看的秒数
+EVENT_DELIVERY_ATTEMPTS = 5  # 事件扫描模式下推送失败的转账最多重试的扫描轮数，超过后放弃
+TRC20_PAGE_LIMIT = 200  # 增量拉取时每页条数（TronGrid 上限 200）
+TRC20_MAX_PAGES = 10  # 单次检查最多翻页数，突发交易量更大时下次检查继续
+MAX_TX_PER_MESSAGE = 20  # 单条推送最多列出的交易笔数
 
 # 用于保存已推送过的交易，避免重复推送
+# （内存中的工作副本，持久化在数据库 tron_seen_txs / tron_cursors 表中）
 last_tx_map = {}
-processed_tx_cache = {}  # 缓存每个地址已处理的交易ID
+processed_tx_cache = SeenTxCache()  # 缓存每个地址已处理的交易ID（有界，未命中时回查数据库）
+tx_cursor_map = {}  # 每个地址已处理到的最新 block_timestamp（毫秒），下次只拉取此后的交易
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+def tron_hex_to_base58(address: str) -> str:
+    """把事件中的十六进制地址（0x + 20 字节或 41 + 20 字节）转换为 T 开头的 Base58Check 地址"""
+    if not address or address.startswith("T"):
+        return address
+    raw = address[2:] if address.startswith("0x") else address
+    if len(raw) == 40:
+        raw = "41" + raw
+    payload = bytes.fromhex(raw)
+    payload += hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+    num = int.from_bytes(payload, "big")
+    encoded = ""
+    while num:
+        num, rem = divmod(num, 58)
+        encoded = BASE58_ALPHABET[rem] + encoded
+    pad = len(payload) - len(payload.lstrip(b"\0"))
+    return "1" * pad + encoded
 
 class TronListener:
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, outbox=None):
         self.bot = bot
+        self.outbox = outbox  # 设置后推送经由发送队列（限速、合并、RetryAfter 重试）
         self.is_running = False
-        
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.http_stats = {
+            "connections_opened": 0, "connections_reused": 0, "requests": 0,
+            "throttled": 0, "server_errors": 0, "retry_after_waits": 0,
+        }
+        # 全局限速 + 自适应并发，多个 API Key 轮询使用
+        self.rate_limiter = TokenBucket(config.TRONGRID_RPS, config.TRONGRID_BURST)
+        self.concurrency = AIMDLimiter(
+            initial=min(5, config.TRONGRID_MAX_CONCURRENCY),
+            maximum=config.TRONGRID_MAX_CONCURRENCY,
+        )
+        self.api_keys = config.TRONGRID_API_KEYS
+        self._key_index = 0
+        # 轮询调度：watched[address] = {"interval", "due"}，schedule 为按 due 排序的小顶堆
+        # 同一地址被多个群监控时只轮询一次，新交易推送给 address_chats 中的所有群
+        self.watched: Dict[str, dict] = {}
+        self.schedule: List[tuple] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: Set[asyncio.Task] = set()
+        # 地址 -> {chat_id: address_info}，推送时按此分发到各群，事件扫描模式还按此哈希表匹配转账双方
+        self.address_chats: Dict[str, Dict[int, dict]] = {}
+        # 推算余额模式：balances[address] = {"balance", "reconciled_at", "applied"}，applied 为链上余额已包含、尚未推送成功的交易 ID
+        self.balances: Dict[str, dict] = {}
+        self.balance_stats = {"derived": 0, "fetched": 0}
+        # 待写入数据库的状态，每轮调度结束后批量写入
+        self._pending_seen: List[tuple] = []
+        self._pending_cursors: Dict[str, dict] = {}
+        # 事件扫描模式中推送失败、等待重试的转账：地址 -> {"txs": {tx_id: tx}, "attempts": 次数}
+        self._undelivered: Dict[str, dict] = {}
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """返回长连接复用的 HTTP 会话，首次调用或已关闭时重新创建"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=DNS_CACHE_TTL,
+            )
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_create)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+            trace_config.on_request_start.append(self._on_request_start)
+            self.session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+        return self.session
+
+    async def close_session(self) -> None:
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def _on_connection_create(self, session, ctx, params) -> None:
+        self.http_stats["connections_opened"] += 1
+
+    async def _on_connection_reuse(self, session, ctx, params) -> None:
+        self.http_stats["connections_reused"] += 1
+
+    async def _on_request_start(self, session, ctx, params) -> None:
+        self.http_stats["requests"] += 1
+
     async def load_persistence(self) -> None:
-        """从文件加载持久化数据"""
-        global last_tx_map, processed_tx_cache
+        """从数据库加载游标与游标之后的已推送交易（启动耗时只与地址数有关）"""
+        global last_tx_map, processed_tx_cache, tx_cursor_map
         try:
-            with open(PERSISTENCE_FILE, 'r') as f:
-                data = json.load(f)
-                last_tx_map = data.get('last_tx_map', {})
-                processed_tx_cache = data.get('processed_tx_cache', {})
-            logger.info(f"已加载 {len(last_tx_map)} 个地址的持久化数据")
-            logger.info(f"已加载 {sum(len(v) for v in processed_tx_cache.values())} 个已处理交易记录")
-        except FileNotFoundError:
-            logger.info("未找到持久化文件，将从零开始监听")
+            await self._import_legacy_persistence()
+        except Exception as e:
+            logger.error(f"导入旧版持久化文件时出错: {e}")
+        try:
+            cursors, seen = await run_db(load_tron_state)
+            tx_cursor_map = {address: c["timestamp"] for address, c in cursors.items()}
+            last_tx_map = {address: c["tx_id"] for address, c in cursors.items()}
+            processed_tx_cache = SeenTxCache()
+            for address, tx_ids in seen.items():
+                processed_tx_cache.update(address, tx_ids)
+            logger.info(f"已加载 {len(tx_cursor_map)} 个地址的持久化数据")
+            logger.info(f"已加载 {len(processed_tx_cache)} 个已处理交易记录")
         except Exception as e:
             logger.error(f"加载持久化数据时出错: {e}")
 
+    async def _import_legacy_persistence(self) -> None:
+        """
+        把旧版 JSON 文件中的游标和已处理交易导入数据库，导入后重命名为 .bak；
+        文件无法解析时（旧版写入集合会失败，留下截断的文件）重命名为 .corrupt，不再重试
+        """
+        if not os.path.exists(LEGACY_PERSISTENCE_FILE):
+            return
+        try:
+            with open(LEGACY_PERSISTENCE_FILE, 'r') as f:
+                data = json.load(f)
+        except ValueError as e:
+            os.replace(LEGACY_PERSISTENCE_FILE, LEGACY_PERSISTENCE_FILE + ".corrupt")
+            logger.warning(f"旧版持久化文件 {LEGACY_PERSISTENCE_FILE} 无法解析，已重命名为 .corrupt: {e}")
+            return
+        last_txs = data.get('last_tx_map', {})
+        cursors = {
+            address: {"timestamp": ts, "tx_id": last_txs.get(address)}
+            for address, ts in data.get('tx_cursor_map', {}).items()
+        }
+        # 旧文件没有交易时间，按游标时间记录，保证在游标推进前继续参与去重
+        seen = [
+            (address, tx_id, cursors.get(address, {}).get("timestamp", 0))
+            for address, tx_ids in data.get('processed_tx_cache', {}).items()
+            for tx_id in tx_ids
+        ]
+        # 旧版只记录了每个地址最后推送的交易 ID（没有游标），作为已推送交易导入，首次检查后即建立游标
+        seen += [(address, tx_id, 0) for address, tx_id in last_txs.items() if tx_id and address not in cursors]
+        await run_db(save_tron_state, seen, cursors)
+        os.replace(LEGACY_PERSISTENCE_FILE, LEGACY_PERSISTENCE_FILE + ".bak")
+        logger.info(f"已从 {LEGACY_PERSISTENCE_FILE} 导入 {len(cursors)} 个地址的旧版持久化数据")
+
+    def _record_processed(self, address: str, new_tx_list: List[dict], latest_ts: int) -> None:
+        """标记交易已推送、计入本地余额并推进游标，同时登记到待写入队列"""
+        self._apply_balance(address, new_tx_list)
+        # new_tx_list 按时间从新到旧排列，从最旧的开始写入，单地址超限时淘汰的是最旧的交易
+        for tx in reversed(new_tx_list):
+            tx_id = tx.get("transaction_id")
+            processed_tx_cache.add(address, tx_id)
+            self._pending_seen.append((address, tx_id, tx.get("block_timestamp", 0)))
+        tx_cursor_map[address] = latest_ts
+        last_tx_map[address] = new_tx_list[0]["transaction_id"]
+        self._pending_cursors[address] = {"timestamp": latest_ts, "tx_id": last_tx_map[address]}
+
+    async def flush_state(self) -> None:
+        """把本轮新推送的交易和游标在一个事务中写入数据库"""
+        if not self._pending_seen and not self._pending_cursors:
+            return
+        seen, cursors = self._pending_seen, self._pending_cursors
+        self._pending_seen, self._pending_cursors = [], {}
+        try:
+            await run_db(save_tron_state, seen, cursors)
+        except Exception as e:
+            # 写入失败时放回队列，下一轮重试
+            self._pending_seen = seen + self._pending_seen
+            self._pending_cursors = {**cursors, **self._pending_cursors}
+            logger.error(f"保存监听状态时出错: {e}")
+
     async def save_persistence(self) -> None:
-        """保存持久化数据到文件"""
+        """写入待保存状态，并清理超过保留期的已推送交易"""
+        await self.flush_state()
         try:
-            data = {
-                'last_tx_map': last_tx_map,
-                'processed_tx_cache': processed_tx_cache
-            }
-            with open(PERSISTENCE_FILE, 'w') as f:
-                json.dump(data, f)
-            logger.info("持久化数据已保存")
+            removed = await run_db(prune_tron_seen, SEEN_TX_RETENTION)
+            if removed:
+                logger.info(f"已清理 {removed} 条过期的已推送交易记录")
         except Exception as e:
-            logger.error(f"保存持久化数据时出错: {e}")
+            logger.error(f"清理已推送交易记录时出错: {e}")
 
-    async def fetch_with_retry(self, session: aiohttp.ClientSession, url: str, retries: int = 3) -> Optional[dict]:
-        """带重试机制的请求函数"""
+    def _next_headers(self) -> Dict[str, str]:
         headers = {"accept": "application/json"}
+        if self.api_keys:
+            headers["TRON-PRO-API-KEY"] = self.api_keys[self._key_index % len(self.api_keys)]
+            self._key_index += 1
+        return headers
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        try:
+            return max(0.0, float(value)) if value else None
+        except ValueError:
+            return None
+
+    async def fetch_with_retry(self, session: aiohttp.ClientSession, url: str, retries: int = 3) -> Optional[dict]:
+        """带限速、自适应并发和重试机制的请求函数"""
         for attempt in range(retries):
+            backoff = 2 ** attempt  # 指数退避
             try:
-                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                    if resp.status == 200:
-                        return await resp.json()
-                    else:
-                        logger.warning(f"请求失败，状态码: {resp.status}，尝试 {attempt + 1}/{retries}")
-                        await asyncio.sleep(2 ** attempt)  # 指数退避
+                await self.rate_limiter.acquire()
+                async with self.concurrency.slot():
+                    async with session.get(url, headers=self._next_headers(), timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                        if resp.status == 200:
+                            self.concurrency.on_success()
+                            return await resp.json()
+
+                        if resp.status == 429 or resp.status >= 500:
+                            # 被限流或服务端过载：并发减半，若有 Retry-After 则全局暂停
+                            self.concurrency.on_throttle()
+                            self.http_stats["throttled" if resp.status == 429 else "server_errors"] += 1
+                            retry_after = self._parse_retry_after(resp.headers.get("Retry-After"))
+                            if retry_after is not None:
+                                self.http_stats["retry_after_waits"] += 1
+                                self.rate_limiter.pause(retry_after)
+                                backoff = retry_after
+                            logger.warning(f"请求被限流/失败，状态码: {resp.status}，尝试 {attempt + 1}/{retries}，并发上限降至 {int(self.concurrency.limit)}")
+                        else:
+                            # 其它 4xx 重试也不会成功
+                            logger.warning(f"请求失败，状态码: {resp.status}: {url}")
+                            return None
             except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                 logger.warning(f"请求异常: {e}，尝试 {attempt + 1}/{retries}")
-                await asyncio.sleep(2 ** attempt)
-        
+            await asyncio.sleep(backoff)
+
         logger.error(f"所有 {retries} 次尝试均失败: {url}")
         return None
 
-    async def fetch_trc20_transactions(self, address: str, limit: int = 20) -> List[dict]:
+    async def fetch_trc20_transactions(self, address: str, limit: int = 20, min_timestamp: Optional[int] = None) -> List[dict]:
         """
-        调用TRON官方API获取USDT(TRC20)交易记录
+        调用TRON官方API获取USDT(TRC20)交易记录（按时间倒序）
+        指定 min_timestamp 时只拉取该时间（含）之后的交易，按时间正序用 fingerprint 翻页，
+        超过翻页上限时先返回较早的部分，其余下次检查从新游标继续
         """
-        url = f"https://api.trongrid.io/v1/accounts/{address}/transactions/trc20?limit={limit}&contract_address=TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
-        async with aiohttp.ClientSession() as session:
+        url = f"{config.TRONGRID_API_URL}/v1/accounts/{address}/transactions/trc20?limit={limit}&contract_address={USDT_CONTRACT}"
+        session = await self.get_session()
+        if min_timestamp is None:
             data = await self.fetch_with_retry(session, url)
             return data.get("data", []) if data else []
 
+        url = f"{config.TRONGRID_API_URL}/v1/accounts/{address}/transactions/trc20?limit={TRC20_PAGE_LIMIT}&contract_address={USDT_CONTRACT}&order_by=block_timestamp,asc&min_timestamp={min_timestamp}"
+        transactions = []
+        fingerprint = None
+        for _ in range(TRC20_MAX_PAGES):
+            page_url = f"{url}&fingerprint={fingerprint}" if fingerprint else url
+            data = await self.fetch_with_retry(session, page_url)
+            if not data:
+                break
+            transactions.extend(data.get("data", []))
+            fingerprint = data.get("meta", {}).get("fingerprint")
+            if not fingerprint:
+                break
+        else:
+            logger.warning(f"地址 {address} 新交易超过 {TRC20_MAX_PAGES} 页，剩余部分下次检查继续拉取")
+        transactions.reverse()
+        return transactions
+
     async def get_balance(self, address: str) -> float:
         """
         获取TRC20 USDT余额 - 使用TRON官方API
         """
-        url = f"https://api.trongrid.io/v1/accounts/{address}"
-        async with aiohttp.ClientSession() as session:
-            data = await self.fetch_with_retry(session, url)
-            if not data:
-                return 0.0
-                
-            # TRON官方API返回结构
-            trc20_contract = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
-            data_list = data.get("data", [])
-            if not data_list:
-                return 0.0
-                
-            account_data = data_list[0]
-            trc20_balances = account_data.get("trc20", [])
-            
-            for balance_info in trc20_balances:
-                if trc20_contract in balance_info:
-                    return float(balance_info[trc20_contract]) / 1_000_000
-                    
+        url = f"{config.TRONGRID_API_URL}/v1/accounts/{address}"
+        session = await self.get_session()
+        data = await self.fetch_with_retry(session, url)
+        if not data:
+            return 0.0
+
+        # TRON官方API返回结构
+        trc20_contract = USDT_CONTRACT
+        data_list = data.get("data", [])
+        if not data_list:
             return 0.0
 
+        account_data = data_list[0]
+        trc20_balances = account_data.get("trc20", [])
+
+        for balance_info in trc20_balances:
+            if trc20_contract in balance_info:
+                return float(balance_info[trc20_contract]) / 1_000_000
+
+        return 0.0
+
+    async def current_balance(self, address: str, new_tx_list: List[dict]) -> float:
+        """
+        返回推送时显示的地址当前 USDT 余额（本地余额加上新交易的转入/转出金额，不修改本地余额）
+        开启 TRON_DERIVED_BALANCE 时，只在首次见到地址或超过核对间隔时才请求链上余额；
+        本地余额在推送成功后由 _apply_balance 更新，推送失败重试时不会重复累加
+        """
+        state = self.balances.get(address)
+        now = time.monotonic()
+        if (
+            config.TRON_DERIVED_BALANCE
+            and state is not None
+            and now - state["reconciled_at"] < config.TRON_BALANCE_RECONCILE_INTERVAL
+        ):
+            self.balance_stats["derived"] += 1
+            return state["balance"] + self._balance_delta(address, new_tx_list, state["applied"])
+
+        balance = await self.get_balance(address)
+        self.balance_stats["fetched"] += 1
+        if config.TRON_DERIVED_BALANCE:
+            if state is not None:
+                expected = state["balance"] + self._balance_delta(address, new_tx_list, state["applied"])
+                if abs(expected - balance) >= 0.01:
+                    logger.warning(f"地址 {address} 推算余额 {expected:.6f} 与链上余额 {balance:.6f} 不一致，已校正")
+            # 链上余额已包含这些新交易，推送成功后不再累加
+            self.balances[address] = {
+                "balance": balance, "reconciled_at": now,
+                "applied": {tx.get("transaction_id") for tx in new_tx_list},
+            }
+        return balance
+
+    @staticmethod
+    def _balance_delta(address: str, new_tx_list: List[dict], applied: Set[str]) -> float:
+        """新交易对余额的影响（转入为正、转出为负），跳过已计入余额的交易"""
+        delta = 0.0
+        for tx in new_tx_list:
+            if tx.get("transaction_id") in applied:
+                continue
+            amount = float(tx.get("value", "0")) / 1_000_000
+            if (tx.get("to") or "").lower() == address.lower():
+                delta += amount
+            if (tx.get("from") or "").lower() == address.lower():
+                delta -= amount
+        return delta
+
+    def _apply_balance(self, address: str, new_tx_list: List[dict]) -> None:
+        """推送成功后把新交易计入本地余额，每笔交易按 ID 只计一次"""
+        state = self.balances.get(address)
+        if not config.TRON_DERIVED_BALANCE or state is None:
+            return
+        state["balance"] += self._balance_delta(address, new_tx_list, state["applied"])
+        state["applied"].difference_update(tx.get("transaction_id") for tx in new_tx_list)
+
     def format_amount_precise(self, amount: float) -> str:
         """
         格式化金额显示
@@ -145,151 +411,353 @@ class TronListener:
         """格式化地址显示为前6个字符（用于交易记录中的对方地址）"""
         return address[:6] if len(address) >= 6 else address
 
-    async def check_address(self, address_info: Dict) -> None:
+    async def check_address(self, address: str) -> bool:
         """
-        检查单个绑定地址的交易情况
+        检查单个监控地址的交易情况，有新交易时推送给所有监控该地址的群并返回 True
         """
-        chat_id = address_info['chat_id']
-        address = address_info['address']
-        remark = address_info.get('remark', '')
-        
         try:
-            transactions = await self.fetch_trc20_transactions(address)
+            # 有游标时只拉取游标之后的交易（游标所在时间戳的交易由已处理集去重）
+            cursor = tx_cursor_map.get(address)
+            transactions = await self.fetch_trc20_transactions(address, min_timestamp=cursor)
             if not transactions:
-                return
+                return False
 
-            # 初始化地址的处理交易缓存
-            if address not in processed_tx_cache:
-                processed_tx_cache[address] = set()
-            
-            # 筛选出新交易（不在已处理交易集中的交易）
-            new_tx_list = []
-            for tx in transactions:
-                tx_id = tx.get("transaction_id")
-                if tx_id not in processed_tx_cache[address]:
-                    new_tx_list.append(tx)
-                else:
-                    # 遇到已处理交易，停止遍历（API返回按时间倒序）
-                    break
-            
+            latest_ts = max(cursor or 0, max(tx.get("block_timestamp", 0) for tx in transactions))
+            new_tx_list = await self.filter_new_transactions(address, transactions)
             if not new_tx_list:
-                return
-                
-            # 更新已处理交易集（最多保留最近50个交易ID）
-            for tx in new_tx_list[:5]:  # 只处理最新的5笔交易
-                tx_id = tx.get("transaction_id")
-                processed_tx_cache[address].add(tx_id)
-            
-            # 限制每个地址的缓存大小
-            if len(processed_tx_cache[address]) > 50:
-                # 转换为列表，保留最新的50个
-                tx_list = list(processed_tx_cache[address])
-                processed_tx_cache[address] = set(tx_list[-50:])
+                # 拉到的都已推送过：仍推进游标（含首次建立游标），之后只拉增量
+                if cursor is None or latest_ts > cursor:
+                    tx_cursor_map[address] = latest_ts
+                    last_tx_map[address] = transactions[0]["transaction_id"]
+                    self._pending_cursors[address] = {"timestamp": latest_ts, "tx_id": last_tx_map[address]}
+                return False
+
+            return await self.deliver_transfers(address, new_tx_list, latest_ts)
+
+        except Exception as e:
+            logger.error(f"处理地址 {address} 时出错: {e}")
+            return False
+
+    async def send_report(self, chat_id: int, text: str) -> None:
+        """推送钱包报账，等待实际发送完成（失败时抛出异常）"""
+        if self.outbox is not None:
+            await self.outbox.send_wallet_report(chat_id, text)
+        else:
+            await self.bot.send_message(chat_id=chat_id, text=text)
+
+    async def filter_new_transactions(self, address: str, transactions: List[dict]) -> List[dict]:
+        """筛选出新交易：缓存命中即已处理，未命中的再回查数据库（缓存可能已淘汰）"""
+        new_tx_list = [tx for tx in transactions if not processed_tx_cache.contains(address, tx.get("transaction_id"))]
+        if new_tx_list:
+            pending = {tx_id for a, tx_id, _ in self._pending_seen if a == address}
+            seen_in_db = await run_db(filter_seen_txs, address, [tx.get("transaction_id") for tx in new_tx_list])
+            known = pending | seen_in_db
+            processed_tx_cache.update(address, seen_in_db)
+            new_tx_list = [tx for tx in new_tx_list if tx.get("transaction_id") not in known]
+        return new_tx_list
+
+    def build_report(self, remark: str, address: str, balance: float, new_tx_list: List[dict]) -> str:
+        """按照指定模板构建推送消息，new_tx_list 按时间倒序"""
+        msg_lines = [
+            f"钱包报账[{remark}]",
+            "",
+            f"💹USDT余额：{self.format_amount_precise(balance)}",
+            "",
+            f"钱包地址：{address}",
+            "",
+            "USDT流水："
+        ]
+        
+        # 添加新交易详情（最多 MAX_TX_PER_MESSAGE 笔）
+        for tx in new_tx_list[:MAX_TX_PER_MESSAGE]:
+            block_timestamp = tx.get("block_timestamp")
+            value = tx.get("value", "0")
+            from_addr = tx.get("from")
+            to_addr = tx.get("to")
             
-            # 更新最后交易ID（使用最新的交易ID）
-            last_tx_map[address] = new_tx_list[0]["transaction_id"]
+            # 格式化时间 - 修改为北京时间 (UTC+8)
+            utc_time = datetime.utcfromtimestamp(block_timestamp / 1000)
+            beijing_time = utc_time.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=8)))
+            ts = beijing_time.strftime("%m-%d %H:%M")
             
-            # 获取当前余额
-            balance = await self.get_balance(address)
+            amount = float(value) / 1_000_000
             
-            # 按照指定模板构建推送消息
-            msg_lines = [
-                f"钱包报账[{remark}]",
-                "",
-                f"💹USDT余额：{self.format_amount_precise(balance)}",
-                "",
-                f"钱包地址：{address}",
-                "",
-                "USDT流水："
-            ]
+            # 判断交易方向
+            is_deposit = to_addr.lower() == address.lower()
             
-            # 添加新交易详情（最多5笔）
-            for tx in new_tx_list[:5]:
-                block_timestamp = tx.get("block_timestamp")
-                value = tx.get("value", "0")
-                from_addr = tx.get("from")
-                to_addr = tx.get("to")
-                
-                # 格式化时间 - 修改为北京时间 (UTC+8)
-                utc_time = datetime.utcfromtimestamp(block_timestamp / 1000)
-                beijing_time = utc_time.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=8)))
-                ts = beijing_time.strftime("%m-%d %H:%M")
-                
-                amount = float(value) / 1_000_000
-                
-                # 判断交易方向
-                is_deposit = to_addr.lower() == address.lower()
-                
-                # 格式化金额
-                amount_formatted = self.format_amount_precise(amount)
-                
-                # 格式化对方地址（只显示前6个字符）
-                counterparty_short = self.format_address_short(from_addr if is_deposit else to_addr)
-                
-                # 添加交易记录行
-                if is_deposit:
-                    # 转入：对方地址 + "转入"
-                    msg_lines.append(f"{ts}    {counterparty_short}转入    {amount_formatted}")
-                else:
-                    # 转出："转出" + 对方地址
-                    msg_lines.append(f"{ts}    转出{counterparty_short}    {amount_formatted}")
+            # 格式化金额
+            amount_formatted = self.format_amount_precise(amount)
             
-            # 发送消息
-            msg_text = "\n".join(msg_lines)
-            await self.bot.send_message(
-                chat_id=chat_id, 
-                text=msg_text
-            )
-            logger.info(f"已向聊天 {chat_id} 发送地址 {address} 的 {len(new_tx_list)} 笔新交易")
+            # 格式化对方地址（只显示前6个字符）
+            counterparty_short = self.format_address_short(from_addr if is_deposit else to_addr)
             
-        except Exception as e:
-            logger.error(f"处理地址 {address} 时出错: {e}")
+            # 添加交易记录行
+            if is_deposit:
+                # 转入：对方地址 + "转入"
+                msg_lines.append(f"{ts}    {counterparty_short}转入    {amount_formatted}")
+            else:
+                # 转出："转出" + 对方地址
+                msg_lines.append(f"{ts}    转出{counterparty_short}    {amount_formatted}")
+
+        if len(new_tx_list) > MAX_TX_PER_MESSAGE:
+            msg_lines.append(f"…… 另有 {len(new_tx_list) - MAX_TX_PER_MESSAGE} 笔较早的交易未列出")
+
+        return "\n".join(msg_lines)
+
+    # ---------- 轮询调度 ----------
+    def _push(self, address: str, due: float) -> None:
+        self.watched[address]["due"] = due
+        heapq.heappush(self.schedule, (due, next(self._seq), address))
+        if self._wakeup:
+            self._wakeup.set()
+
+    def add_address(self, address_info: Dict, due: Optional[float] = None) -> None:
+        """加入监控（设置地址时调用），地址首次出现时默认立即安排一次检查，已在监控中的只登记新的群"""
+        address = address_info['address']
+        self.address_chats.setdefault(address, {})[address_info['chat_id']] = address_info
+        if address in self.watched:
+            return
+        self.watched[address] = {"interval": CHECK_INTERVAL, "due": None}
+        self._push(address, time.monotonic() if due is None else due)
+
+    def remove_address(self, chat_id: int, address: str) -> None:
+        """移出监控（删除地址时调用），没有群再监控该地址时停止轮询，堆中残留的条目在弹出时丢弃"""
+        chats = self.address_chats.get(address, {})
+        chats.pop(chat_id, None)
+        if not chats:
+            self.address_chats.pop(address, None)
+            self.watched.pop(address, None)
+            self._undelivered.pop(address, None)
+            self.balances.pop(address, None)
+            processed_tx_cache.discard_address(address)
+
+    async def sync_addresses(self) -> None:
+        """与数据库中的地址列表比对，只增删差异部分；新地址在一个周期内均匀错开"""
+        all_addresses = await run_db(get_all_wallet_addresses)
+        current = {(a['chat_id'], a['address']): a for a in all_addresses}
+        for address, chats in list(self.address_chats.items()):
+            for chat_id in list(chats):
+                if (chat_id, address) not in current:
+                    self.remove_address(chat_id, address)
+        new_addresses = list(dict.fromkeys(address for _, address in current if address not in self.watched))
+        now = time.monotonic()
+        for i, address in enumerate(new_addresses):
+            self.watched[address] = {"interval": CHECK_INTERVAL, "due": None}
+            self._push(address, now + i * CHECK_INTERVAL / len(new_addresses))
+        for (chat_id, address), info in current.items():
+            self.address_chats.setdefault(address, {})[chat_id] = info
+        if new_addresses:
+            logger.info(f"新增 {len(new_addresses)} 个监控地址，当前共 {len(self.watched)} 个")
+
+    async def _run_check(self, address: str) -> None:
+        if address not in self.watched:
+            return
+        has_new = await self.check_address(address)
+        entry = self.watched.get(address)
+        if entry is None:
+            return
+        # 有新交易的地址提高频率，空闲地址逐步降低频率
+        if has_new:
+            entry["interval"] = config.TRON_MIN_POLL_INTERVAL
+        else:
+            entry["interval"] = min(config.TRON_MAX_POLL_INTERVAL, max(config.TRON_MIN_POLL_INTERVAL, entry["interval"] * IDLE_BACKOFF))
+        self._push(address, time.monotonic() + entry["interval"])
 
     async def start_listening(self):
         """启动 TRON 监听器"""
         # 加载持久化数据
         await self.load_persistence()
-        
-        # 保存计数器（每10次循环保存一次持久化数据）
-        save_counter = 0
-        
+
         self.is_running = True
+        self._wakeup = asyncio.Event()
+
+        if config.TRON_INGEST_MODE == "events":
+            logger.info("TRON监听推送已启动（合约事件扫描模式）...")
+            await self.scan_events()
+            return
+
         logger.info("TRON监听推送已启动...")
-        
+
+        next_sync = 0.0
+        next_save = time.monotonic() + SAVE_INTERVAL
+
         while self.is_running:
             try:
-                all_addresses = get_all_wallet_addresses()
-                if not all_addresses:
-                    logger.info("未找到任何监控地址")
-                    await asyncio.sleep(CHECK_INTERVAL)
-                    continue
-                    
-                logger.info(f"开始检查 {len(all_addresses)} 个地址")
-                
-                # 使用Semaphore限制并发数量，避免过多请求
-                semaphore = asyncio.Semaphore(5)
-                
-                async def limited_check(addr):
-                    async with semaphore:
-                        return await self.check_address(addr)
-                
-                tasks = [limited_check(addr) for addr in all_addresses]
-                await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # 每10次循环保存一次持久化数据
-                save_counter += 1
-                if save_counter >= 10:
+                now = time.monotonic()
+                if now >= next_sync:
+                    await self.sync_addresses()
+                    next_sync = now + ADDRESS_RESYNC_INTERVAL
+                    if not self.watched:
+                        logger.info("未找到任何监控地址")
+
+                if now >= next_save:
                     await self.save_persistence()
-                    save_counter = 0
-                
-                await asyncio.sleep(CHECK_INTERVAL)
-                
+                    next_save = now + SAVE_INTERVAL
+                    logger.info(f"HTTP 连接统计: {self.http_stats}，当前并发上限: {int(self.concurrency.limit)}，余额统计: {self.balance_stats}，已处理交易缓存: {len(processed_tx_cache)} 条/淘汰 {processed_tx_cache.evictions} 条")
+
+                # 取出所有到期地址，逐个启动检查（速率与并发由 fetch_with_retry 中的限速器控制）
+                while self.schedule and self.schedule[0][0] <= now:
+                    due, _, address = heapq.heappop(self.schedule)
+                    entry = self.watched.get(address)
+                    if entry is None or entry["due"] != due:
+                        continue  # 已删除或已重新排期
+                    task = asyncio.create_task(self._run_check(address))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+                # 本轮完成的检查结果批量写入数据库
+                await self.flush_state()
+
+                # 睡到下一个到期时间，新增地址或检查完成时提前唤醒
+                next_due = self.schedule[0][0] if self.schedule else now + CHECK_INTERVAL
+                timeout = max(0.0, min(next_due, next_sync, next_save) - time.monotonic())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
             except Exception as e:
                 logger.error(f"TRON监听器主循环发生错误: {e}")
                 await asyncio.sleep(60)  # 出错时等待更长时间
-    
+
+    # ---------- 合约事件扫描 ----------
+    async def fetch_transfer_events(self, min_timestamp: int) -> List[dict]:
+        """按时间正序拉取 USDT 合约在 min_timestamp（含）之后的 Transfer 事件"""
+        url = (
+            f"{config.TRONGRID_API_URL}/v1/contracts/{USDT_CONTRACT}/events?event_name=Transfer"
+            f"&only_confirmed=true&order_by=block_timestamp,asc&limit={TRC20_PAGE_LIMIT}&min_block_timestamp={min_timestamp}"
+        )
+        session = await self.get_session()
+        events = []
+        fingerprint = None
+        for _ in range(TRC20_MAX_PAGES):
+            page_url = f"{url}&fingerprint={fingerprint}" if fingerprint else url
+            data = await self.fetch_with_retry(session, page_url)
+            if not data:
+                break
+            events.extend(data.get("data", []))
+            fingerprint = data.get("meta", {}).get("fingerprint")
+            if not fingerprint:
+                break
+        return events
+
+    async def notify_transfers(self, address: str, transactions: List[dict]) -> bool:
+        """筛选出某个地址的新转账并推送，没有新转账或推送成功时返回 True"""
+        new_tx_list = await self.filter_new_transactions(address, transactions)
+        if not new_tx_list:
+            return True
+        new_tx_list.sort(key=lambda tx: tx.get("block_timestamp", 0), reverse=True)
+        return await self.deliver_transfers(address, new_tx_list, new_tx_list[0].get("block_timestamp", 0))
+
+    async def deliver_transfers(self, address: str, new_tx_list: List[dict], latest_ts: int) -> bool:
+        """
+        把新交易（按时间从新到旧）推送给所有监控该地址的群，至少一个群推送成功即标记已处理并推进游标；
+        全部失败时不标记，下次检查会重新推送
+        """
+        balance = await self.current_balance(address, new_tx_list)
+
+        chats = list(self.address_chats.get(address, {}).items())
+        results = await asyncio.gather(
+            *(self.send_report(chat_id, self.build_report(info.get('remark', ''), address, balance, new_tx_list))
+              for chat_id, info in chats),
+            return_exceptions=True
+        )
+        delivered = False
+        for (chat_id, _), result in zip(chats, results):
+            if isinstance(result, Exception):
+                logger.error(f"向聊天 {chat_id} 推送地址 {address} 时出错: {result}")
+            else:
+                delivered = True
+                logger.info(f"已向聊天 {chat_id} 发送地址 {address} 的 {len(new_tx_list)} 笔新交易")
+
+        if delivered:
+            self._record_processed(address, new_tx_list, latest_ts)
+        return delivered
+
+    async def scan_events(self) -> None:
+        """
+        跟随 USDT 合约的 Transfer 事件，用内存哈希表匹配所有监控地址：
+        API 调用次数与监控地址数量无关
+        """
+        cursor = tx_cursor_map.get(EVENT_CURSOR_KEY) or int((time.time() - EVENT_START_LOOKBACK) * 1000)
+        next_sync = 0.0
+        next_save = time.monotonic() + SAVE_INTERVAL
+
+        while self.is_running:
+            try:
+                now = time.monotonic()
+                if now >= next_sync:
+                    await self.sync_addresses()
+                    next_sync = now + ADDRESS_RESYNC_INTERVAL
+                if now >= next_save:
+                    await self.save_persistence()
+                    next_save = now + SAVE_INTERVAL
+                    logger.info(f"HTTP 连接统计: {self.http_stats}，事件游标: {cursor}")
+
+                events = await self.fetch_transfer_events(cursor)
+                matched: Dict[str, List[dict]] = {}
+                for event in events:
+                    result = event.get("result", {})
+                    tx = {
+                        "transaction_id": event.get("transaction_id"),
+                        "block_timestamp": event.get("block_timestamp", 0),
+                        "from": tron_hex_to_base58(result.get("from", "")),
+                        "to": tron_hex_to_base58(result.get("to", "")),
+                        "value": result.get("value", "0"),
+                    }
+                    for address in {tx["from"], tx["to"]}:
+                        if address in self.address_chats:
+                            matched.setdefault(address, []).append(tx)
+
+                # 上一轮推送失败的转账与本轮一起重试
+                for address, pending in self._undelivered.items():
+                    if address in self.address_chats:
+                        matched.setdefault(address, []).extend(pending["txs"].values())
+                for address, transactions in matched.items():
+                    if await self.notify_transfers(address, transactions):
+                        self._undelivered.pop(address, None)
+                    else:
+                        self._defer_transfers(address, transactions)
+
+                # 游标总是越过本轮拉到的事件，推送失败的转账由重试队列处理，不会卡住所有地址；
+                # 游标时间戳上的事件下次会重复拉到，由已处理集去重
+                if events:
+                    cursor = max(cursor, max(e.get("block_timestamp", 0) for e in events))
+                    tx_cursor_map[EVENT_CURSOR_KEY] = cursor
+                    self._pending_cursors[EVENT_CURSOR_KEY] = {"timestamp": cursor, "tx_id": events[-1].get("transaction_id")}
+                await self.flush_state()
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=EVENT_SCAN_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+            except Exception as e:
+                logger.error(f"TRON事件扫描发生错误: {e}")
+                await asyncio.sleep(EVENT_SCAN_INTERVAL * 10)
+
+    def _defer_transfers(self, address: str, transactions: List[dict]) -> None:
+        """记录推送失败的转账，下一轮扫描重试；连续失败 EVENT_DELIVERY_ATTEMPTS 轮后放弃"""
+        pending = self._undelivered.setdefault(address, {"txs": {}, "attempts": 0})
+        for tx in transactions:
+            pending["txs"][tx["transaction_id"]] = tx
+        pending["attempts"] += 1
+        if pending["attempts"] >= EVENT_DELIVERY_ATTEMPTS:
+            self._undelivered.pop(address)
+            logger.error(
+                f"地址 {address} 的 {len(pending['txs'])} 笔转账连续 {pending['attempts']} 轮推送失败，已放弃: "
+                f"{', '.join(pending['txs'])}"
+            )
+
     async def stop_listening(self):
         """停止 TRON 监听器"""
         self.is_running = False
+        if self._wakeup:
+            self._wakeup.set()
+        for task in list(self._tasks):
+            task.cancel()
         await self.save_persistence()
-        logger.info("TRON监听器已停止")
+        await self.close_session()
+        logger.info(f"TRON监听器已停止，HTTP 连接统计: {self.http_stats}")
@@ -0,0 +1,7 @@
+"""
+完整账单网页的 WSGI 入口，生产环境与 bot 分开进程运行:
+
+    BILL_SERVER_MODE=external python bot.py
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from full_bill import app  # noqa: F401